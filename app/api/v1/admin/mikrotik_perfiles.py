@@ -150,10 +150,11 @@ async def obtener_perfiles_mikrotik_router(
 @router.get("/routers/{router_id}/test-connection")
 async def test_conexion_mikrotik(
     router_id: str,
+    incluir_perfiles: bool = False,
     usuario = Depends(require_cliente_admin),
     db: AsyncSession = Depends(get_db)
 ):
-    """Probar conexión con router MikroTik usando MikrotikAPI"""
+    """Probar conexión con router MikroTik (con ?incluir_perfiles=true también cuenta los perfiles)"""
     print(f"🔍 Test conexión para router: {router_id}")
     
     # 1. Verificar que el router existe
@@ -182,7 +183,8 @@ async def test_conexion_mikrotik(
             router_host=router_obj.host,
             router_port=router_obj.puerto,
             router_user=router_obj.usuario,
-            router_password=router_obj.password_encrypted
+            router_password=router_obj.password_encrypted,
+            include_profiles=incluir_perfiles
         )
         
         return {
@@ -195,7 +197,7 @@ async def test_conexion_mikrotik(
                 "puerto": router_obj.puerto,
                 "activo": router_obj.activo
             },
-            "perfiles_encontrados": test_result.get("profiles_count", 0),
+            "perfiles_encontrados": test_result.get("profiles_count"),
             "router_name": test_result.get("router_name"),
             "error": test_result.get("error"),
             "timestamp": datetime.now().isoformat()
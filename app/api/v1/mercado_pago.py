@@ -18,10 +18,9 @@ from app.services.telegram_service import telegram_service
 from app.schemas.request.mercado_pago import MercadoPagoPaymentRequest
 from app.models.producto import Producto
 from app.models.transaccion import Transaccion
-from fastapi import logger
+import logging
 
-
-import json
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Pagar Hotspot - Mercado Pago"])
 
@@ -104,29 +103,21 @@ async def pagar_hotspot_mercado_pago(
     8. Retornar credenciales al cliente
     """
     
-    print("\n" + "="*70)
-    print("🚀 INICIANDO PROCESO DE PAGO MERCADO PAGO")
-    print("="*70)
-    
     empresa, router, auth_info = auth_data
     
-    print(f"🏢 Empresa: {empresa.nombre} ({empresa.id})")
-    print(f"🌐 Router: {router.host}:{router.puerto}")
-    print(f"👤 Cliente: {payment_data.customer_name}")
-    print(f"📧 Email: {payment_data.customer_email}")
+    logger.info(
+        "🚀 Pago Mercado Pago: empresa=%s router=%s:%s",
+        empresa.id, router.host, router.puerto
+    )
     
     # 1. Validar que la empresa tiene configurado Mercado Pago
     if not empresa.mercado_pago_access_token:
-        print(f"❌ EMPRESA SIN CONFIGURACIÓN MERCADO PAGO")
+        logger.warning("❌ Empresa %s sin configuración de Mercado Pago", empresa.id)
         raise HTTPException(
             status_code=400,
             detail="La empresa no tiene configurado Mercado Pago"
         )
     
-    print(f"✅ Empresa tiene configurado Mercado Pago")
-    print(f"   • Modo: {empresa.mercado_pago_mode or 'test'}")
-    print(f"   • Token: {'*' * 20}{empresa.mercado_pago_access_token[-10:] if empresa.mercado_pago_access_token else 'N/A'}")
-    
     # 2. Obtener producto
     result = await db.execute(
         select(Producto).where(Producto.id == payment_data.product_id)
@@ -134,56 +125,37 @@ async def pagar_hotspot_mercado_pago(
     producto = result.scalar_one_or_none()
     
     if not producto or producto.empresa_id != empresa.id:
-        print(f"❌ PRODUCTO NO ENCONTRADO")
-        print(f"   • ID buscado: {payment_data.product_id}")
-        print(f"   • Empresa ID: {empresa.id}")
+        logger.warning(
+            "❌ Producto %s no encontrado para empresa %s",
+            payment_data.product_id, empresa.id
+        )
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     
-    print(f"✅ Producto encontrado:")
-    print(f"   • Nombre: {producto.nombre_venta}")
-    print(f"   • Precio: ${producto.precio} {producto.moneda}")
-    print(f"   • Perfil MikroTik: {producto.perfil_mikrotik_nombre}")
-    
     # 3. Validar que el monto coincida con el producto (con tolerancia)
     if abs(payment_data.transaction_amount - float(producto.precio)) > 0.01:
-        print(f"❌ ERROR DE MONTO NO COINCIDENTE")
-        print(f"   • Monto recibido: ${payment_data.transaction_amount:.2f}")
-        print(f"   • Precio producto: ${producto.precio:.2f}")
-        print(f"   • Diferencia: ${abs(payment_data.transaction_amount - float(producto.precio)):.2f}")
+        logger.warning(
+            "❌ Monto no coincidente: recibido=%.2f precio=%.2f",
+            payment_data.transaction_amount, producto.precio
+        )
         raise HTTPException(
             status_code=400,
             detail=f"El monto (${payment_data.transaction_amount:.2f}) no coincide con el producto (${producto.precio:.2f})"
         )
     
-    print(f"✅ Monto validado correctamente: ${payment_data.transaction_amount}")
-    
     # 4. Normalizar tipo de usuario
     user_type = payment_data.user_type or "usuario_contrasena"
     if user_type not in ["usuario_contrasena", "pin"]:
         user_type = "usuario_contrasena"
     
-    print(f"🔧 Tipo de usuario: {user_type}")
-    
     # 5. Validar parámetros para auto-conexión
     auto_connect_requested = payment_data.auto_connect
     
-    print(f"🔗 Conexión automática: {'Activada' if auto_connect_requested else 'Desactivada'}")
-    if auto_connect_requested:
-        print(f"   • MAC Cliente: {payment_data.mac_address or 'No proporcionada'}")
-        print(f"   • IP Cliente: {payment_data.ip_address or 'No proporcionada'}")
-    
     # 6. Generar credenciales según tipo de usuario
     credentials = mikrotik_service.generate_credentials(user_type=user_type)
     usuario_creado = False
     
-    print(f"🔐 Credenciales generadas:")
-    print(f"   • Usuario: {credentials['username']}")
-    print(f"   • Contraseña: {credentials['password']}")
-    
     try:
         # 🔴 **PASO CRÍTICO 1: CREAR USUARIO EN MIKROTIK**
-        print(f"\n🔴 CREANDO USUARIO EN MIKROTIK...")
-        
         await mikrotik_service.create_hotspot_user(
             router_host=router.host,
             router_port=router.puerto,
@@ -196,13 +168,15 @@ async def pagar_hotspot_mercado_pago(
         )
         
         usuario_creado = True
-        print(f"✅✅✅ USUARIO CREADO EN MIKROTIK")
+        logger.info(
+            "✅ Usuario hotspot %s (%s) creado en %s",
+            credentials["username"], user_type, router.host
+        )
         
         # 🟢 **PASO CRÍTICO 2: PROCESAR PAGO EN MERCADO PAGO**
-        print(f"\n🟢 PROCESANDO PAGO CON MERCADO PAGO...")
-        
-        # Log del payload recibido del frontend para depuración (Cambio nuevo)
-        print(f"📥 Payload recibido del frontend: {json.dumps(payment_data.dict(), indent=2)}")
+        # Payload del frontend sólo en DEBUG (sin serializar en producción)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📥 Payload recibido del frontend: %s", payment_data.model_dump_json(indent=2))
 
         #antes de encritpar
         """ payment_result = await mercado_pago_service.create_payment( 
@@ -248,19 +222,18 @@ async def pagar_hotspot_mercado_pago(
         )
 
         
-        print(f"✅✅✅ PAGO PROCESADO")
-        print(f"   • Status: {payment_result['status']}")
-        print(f"   • ID: {payment_result['payment_id']}")
+        logger.info(
+            "✅ Pago MP %s procesado: %s",
+            payment_result["payment_id"], payment_result["status"]
+        )
         
         # Validar estado (usando tu función)
         es_valido, mensaje_error = validar_estado_mercado_pago(payment_result)
         
         if not es_valido:
-            print(f"❌ PAGO INVÁLIDO: {mensaje_error}")
+            logger.warning("❌ Pago MP inválido: %s", mensaje_error)
             raise HTTPException(status_code=402, detail=mensaje_error)
         
-        print(f"✅✅✅ PAGO VALIDADO Y APROBADO")
-        
         # 📢 Notificar Pago Aprobado (Telegram)
         if empresa.notificaciones_telegram:
             # Construir info de credenciales según tipo
@@ -285,8 +258,6 @@ async def pagar_hotspot_mercado_pago(
             )
         
         # 7. Guardar transacción
-        print(f"\n💾 GUARDANDO TRANSACCIÓN EN BD...")
-        
         transaccion = Transaccion(
             transaccion_id=str(payment_result["payment_id"]),
             external_reference=payment_result["external_reference"],  # ✅ YA LO TIENES
@@ -325,19 +296,15 @@ async def pagar_hotspot_mercado_pago(
         db.add(transaccion)
         await db.commit()
         
-        print(f"✅✅✅ TRANSACCIÓN GUARDADA: {transaccion.transaccion_id}")
-        print(f"   • Tipo usuario: {user_type}")
-        print(f"   • Estado pago: {transaccion.estado_pago}")
+        logger.info(
+            "💾 Transacción %s guardada (%s)",
+            transaccion.transaccion_id, transaccion.estado_pago
+        )
         
         # 🔄 **EJECUTAR AUTO-CONEXIÓN SI SE SOLICITÓ**
         auto_conexion_resultado = None
         if auto_connect_requested and payment_data.mac_address:
             try:
-                print(f"\n🔗 EJECUTANDO AUTO-CONEXIÓN...")
-                print(f"   • MAC: {payment_data.mac_address}")
-                print(f"   • IP: {payment_data.ip_address or 'No especificada'}")
-                print(f"   • Usuario: {credentials['username']}")
-                
                 auto_conexion_resultado = await ejecutar_auto_conexion(
                     router_host=router.host,
                     router_port=router.puerto,
@@ -350,19 +317,23 @@ async def pagar_hotspot_mercado_pago(
                 )
                 
                 if auto_conexion_resultado and auto_conexion_resultado.get("conectado"):
-                    print(f"✅✅✅ AUTO-CONEXIÓN VERIFICADA")
-                    print(f"   • Session ID: {auto_conexion_resultado.get('session_id')}")
-                    print(f"   • IP asignada: {auto_conexion_resultado.get('ip')}")
+                    logger.info(
+                        "🔗 Auto-conexión verificada: session=%s ip=%s",
+                        auto_conexion_resultado.get("session_id"), auto_conexion_resultado.get("ip")
+                    )
                 elif auto_conexion_resultado and auto_conexion_resultado.get("success"):
-                    print(f"⚠️  AUTO-LOGIN EJECUTADO PERO NO VERIFICADO")
+                    logger.warning("⚠️  Auto-login ejecutado pero no verificado")
                 else:
-                    print(f"⚠️  AUTO-CONEXIÓN FALLÓ PARCIALMENTE")
-                    print(f"   • Error: {auto_conexion_resultado.get('error')}")
+                    logger.warning(
+                        "⚠️  Auto-conexión falló parcialmente: %s",
+                        auto_conexion_resultado.get("error") if auto_conexion_resultado else None
+                    )
                     
             except Exception as auto_connect_error:
-                print(f"⚠️  ERROR EN AUTO-CONEXIÓN:")
-                print(f"   • Tipo: {type(auto_connect_error).__name__}")
-                print(f"   • Mensaje: {str(auto_connect_error)}")
+                logger.warning(
+                    "⚠️  Error en auto-conexión: %s: %s",
+                    type(auto_connect_error).__name__, auto_connect_error
+                )
                 auto_conexion_resultado = {
                     "success": False,
                     "conectado": False,
@@ -413,26 +384,18 @@ async def pagar_hotspot_mercado_pago(
         if payment_result["status"] == "pending" and "warning" in payment_result:
             response_data["advertencia"] = payment_result["warning"]
         
-        print(f"\n📤 ENVIANDO RESPUESTA AL CLIENTE")
-        print(f"   • ID Transacción: {response_data['id_transaccion']}")
-        print(f"   • Estado: {response_data['estado_pago']}")
-        print(f"   • Usuario: {response_data['usuario_hotspot']['usuario']}")
-        
-        print("\n" + "="*70)
-        print("🎉 PROCESO COMPLETADO EXITOSAMENTE")
-        print("="*70 + "\n")
-        
         return response_data
         
     # 🔴 **MANEJO DE ERRORES HTTP (de mercado_pago_service u otros)**
     except HTTPException as http_exc:
-        print(f"\n❌❌❌ ERROR HTTP {http_exc.status_code}")
-        print(f"   • Detalle: {http_exc.detail}")
-        print(f"   • Usuario creado: {usuario_creado}")
+        logger.warning(
+            "❌ Error HTTP %s en pago MP: %s (usuario creado: %s)",
+            http_exc.status_code, http_exc.detail, usuario_creado
+        )
         
         # Rollback si hay error (400+) y el usuario fue creado
         if usuario_creado:
-            print(f"🔄 EJECUTANDO ROLLBACK POR ERROR EN PAGO ({http_exc.status_code})...")
+            logger.info("🔄 Rollback del usuario %s", credentials["username"])
             await rollback_usuario(router, credentials["username"], user_type)
         
         # 📢 Notificar Pago Rechazado (Telegram)
@@ -504,8 +467,6 @@ async def consultar_estado_pago(
         token_manager = SecureTokenManager()
         access_token = token_manager.decrypt_if_needed(empresa.mercado_pago_access_token)
         
-        print(f"🔑 Access Token usado en consulta (primeros 10 chars): {access_token[:10]}...")  # para debug
-        
         payment_status = await mercado_pago_service.get_payment_status(
             access_token=access_token,  # ← ahora desencriptado
             payment_id=payment_id
@@ -357,7 +357,7 @@ async def pagar_hotspot_conekta(
         payment_result = await conekta_service.create_order(
             private_key=empresa.conekta_private_key,
             mode=empresa.conekta_mode,
-            amount=float(producto.precio),
+            amount=producto.precio,
             currency=producto.moneda,
             card_token=payment_data.card_token,
             customer_info={
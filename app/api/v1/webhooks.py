@@ -3,9 +3,7 @@ from fastapi import APIRouter, Request, HTTPException, Depends, BackgroundTasks,
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import json
-import hashlib
 import logging
-import hmac
 from datetime import datetime
 from typing import Optional, Dict, Any
 
@@ -31,53 +29,14 @@ def verify_webhook_signature(
     Verificar la firma del webhook de Mercado Pago (formato oficial actual)
     Manifest: id:{data_id};request-id:{request_id};ts:{timestamp};
     """
-    if not signature_header or not request_id_header or not data_id or not secret_key:
-        logger.warning("Faltan datos requeridos para verificar la firma del webhook")
-        return False
-    
     try:
-        logger.info(f"🔐 VERIFICACIÓN DE FIRMA (FORMATO OFICIAL MERCADO PAGO)")
-        
-        # Parsear X-Signature de forma más robusta: ts=xxx,v1=yyy
-        parts = [p.strip() for p in signature_header.split(',')]
-        timestamp = None
-        received_hash = None
-        
-        for part in parts:
-            if part.startswith("ts="):
-                timestamp = part[3:]
-            elif part.startswith("v1="):
-                received_hash = part[3:]
-        
-        if not timestamp or not received_hash:
-            logger.error(f"Formato X-Signature inválido o incompleto: {signature_header}")
-            return False
-        
-        # Construir el manifest correcto (exacto según docs MP 2025+)
-        message = f"id:{data_id};request-id:{request_id_header};ts:{timestamp};"
-        
-        # Calcular HMAC-SHA256
-        expected_hash = hmac.new(
-            secret_key.encode('utf-8'),
-            message.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
-        
-        # Logs para debug mejorados
-        logger.info(f"   • Timestamp: {timestamp}")
-        logger.info(f"   • Data ID: {data_id}")
-        logger.info(f"   • Request-ID: {request_id_header}")
-        logger.info(f"   • Manifest completo: '{message}'")
-        logger.info(f"   • Hash esperado (primeros 10 chars): {expected_hash[:10]}...")
-        logger.info(f"   • Hash recibido (primeros 10 chars): {received_hash[:10]}...")
-        logger.info(f"   • Coinciden: {hmac.compare_digest(expected_hash, received_hash)}")
-        
-        return hmac.compare_digest(expected_hash, received_hash)
-        
+        return mercado_pago_service.verify_webhook_signature(
+            signature_header, request_id_header, data_id, secret_key
+        )
     except Exception as e:
         logger.error(f"💥 Error verificando firma: {str(e)}", exc_info=True)
         return False
-     
+
 
 async def find_transaction_by_external_ref(db: AsyncSession, external_reference: str) -> Optional[Transaccion]:
     """Buscar transacción por external_reference"""
@@ -237,6 +196,8 @@ async def process_mercado_pago_notification(
         # Debug para confirmar que ahora es el token real
         logger.info(f"🔑 Access Token usado en webhook (primeros 10 chars): {access_token[:10]}...")
 
+        # El webhook avisa de un cambio: no confiar en el estado cacheado
+        mercado_pago_service.invalidate_payment_status(access_token, int(payment_id))
         payment_status = await mercado_pago_service.get_payment_status(
             access_token=access_token,           # ← AHORA sí desencriptado
             payment_id=int(payment_id)
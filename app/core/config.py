@@ -36,6 +36,16 @@ class Settings(BaseSettings):
     # Clave para encriptar access_token y webhook_secret de Mercado Pago
     ENCRYPTION_KEY_MERCADO_PAGO: str = Field("", env="ENCRYPTION_KEY_MERCADO_PAGO")
     
+    # Máximo de llamadas simultáneas a la API de Mercado Pago (evita 429 en picos)
+    MP_MAX_CONCURRENCY: int = Field(25, env="MP_MAX_CONCURRENCY")
+    # Incluir la respuesta completa de MP ("raw_response") en las respuestas (sólo debug)
+    DEBUG_RAW_MP_RESPONSE: bool = Field(False, env="DEBUG_RAW_MP_RESPONSE")
+    
+    # Hilos del executor por defecto: to_thread (bcrypt, JSON) y los workers de
+    # login/reconexión hotspot, que retienen un hilo varios segundos mientras sondean.
+    # Las RPC de MikroTikService usan su propio executor (MikroTikService.MAX_WORKERS).
+    BLOCKING_IO_WORKERS: int = Field(64, env="BLOCKING_IO_WORKERS")
+    
     # App
     APP_NAME: str = Field("MikroTik Payment API", env="APP_NAME")
     DEBUG: bool = Field(False, env="DEBUG")
@@ -0,0 +1,43 @@
+# app/core/logging_config.py
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(level: int = logging.INFO) -> None:
+    """
+    Configurar logging no bloqueante.
+
+    Los loggers sólo encolan el registro (put_nowait); un hilo en segundo
+    plano (QueueListener) es quien escribe en stdout, así el event loop
+    nunca espera por la escritura.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Vaciar la cola y detener el hilo de escritura"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -4,8 +4,10 @@ import socket
 import ssl
 import time
 import functools
+import queue
 import threading
-from typing import List, Dict, Any
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from librouteros import connect
 from librouteros.exceptions import TrapError, LibRouterosError
 
@@ -138,7 +140,8 @@ class MikrotikAPI:
         if not self.connection:
             return False
         try:
-            list(self.connection(cmd="/system/identity/print"))
+            # Ping mínimo: una fila con un solo campo
+            list(self.connection.rawCmd("/system/identity/print", "=.proplist=name"))
             return True
         except:
             return False
@@ -172,4 +175,119 @@ class MikrotikAPI:
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
\ No newline at end of file
+        self.close()
+
+
+class MikrotikPool:
+    """
+    Pool de sesiones MikrotikAPI reutilizables por router (thread-safe).
+    
+    Evita el TCP + login de RouterOS en cada operación: las sesiones libres
+    se guardan por (host, puerto, usuario, password), se validan con un ping
+    antes de reutilizarse y se cierran tras idle_ttl segundos sin uso.
+    """
+    
+    def __init__(self, max_idle_per_router: int = 3, idle_ttl: float = 60.0):
+        # Pocas sesiones por router: RouterOS limita las sesiones API simultáneas
+        self.max_idle_per_router = max_idle_per_router
+        self.idle_ttl = idle_ttl
+        self._pools: Dict[tuple, "queue.LifoQueue[Tuple[MikrotikAPI, float]]"] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+    
+    def _pool_for(self, key: tuple) -> "queue.LifoQueue[Tuple[MikrotikAPI, float]]":
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = queue.LifoQueue(maxsize=self.max_idle_per_router)
+            if self._reaper is None:
+                self._reaper = threading.Thread(
+                    target=self._reap_loop, name="mikrotik-pool-reaper", daemon=True
+                )
+                self._reaper.start()
+            return pool
+    
+    def _checkout(self, pool: "queue.LifoQueue[Tuple[MikrotikAPI, float]]") -> Optional[MikrotikAPI]:
+        """Sacar la sesión libre más reciente que siga viva"""
+        while True:
+            try:
+                api, last_used = pool.get_nowait()
+            except queue.Empty:
+                return None
+            if time.monotonic() - last_used < self.idle_ttl and api.is_opened():
+                return api
+            api.close()
+    
+    @contextmanager
+    def acquire(
+        self,
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        timeout: int = 10
+    ) -> Iterator[MikrotikAPI]:
+        """
+        Obtener una sesión abierta para el router; al salir vuelve al pool.
+        
+        Si el bloque lanza una excepción la sesión se cierra en lugar de
+        devolverse, porque su estado es desconocido. Un bloque que capture
+        un error de E/S por su cuenta debe llamar a api.close(): las sesiones
+        cerradas tampoco vuelven al pool.
+        """
+        pool = self._pool_for((host, port, username, password))
+        api = self._checkout(pool)
+        if api is None:
+            api = MikrotikAPI(host, port, username, password, timeout=timeout)
+            api.open()
+        
+        try:
+            yield api
+        except BaseException:
+            api.close()
+            raise
+        
+        if api.connection is None:
+            return
+        try:
+            pool.put_nowait((api, time.monotonic()))
+        except queue.Full:
+            api.close()
+    
+    def _reap_loop(self):
+        while True:
+            time.sleep(self.idle_ttl / 2)
+            self.reap()
+    
+    def reap(self, max_idle: Optional[float] = None):
+        """Cerrar las sesiones libres sin uso desde hace más de max_idle segundos"""
+        max_idle = self.idle_ttl if max_idle is None else max_idle
+        with self._lock:
+            pools = list(self._pools.values())
+        
+        now = time.monotonic()
+        for pool in pools:
+            keep = []
+            while True:
+                try:
+                    api, last_used = pool.get_nowait()
+                except queue.Empty:
+                    break
+                if now - last_used >= max_idle:
+                    api.close()
+                else:
+                    keep.append((api, last_used))
+            # Devolver de la más antigua a la más reciente para conservar el orden LIFO
+            for item in reversed(keep):
+                try:
+                    pool.put_nowait(item)
+                except queue.Full:
+                    item[0].close()
+    
+    def close_all(self):
+        """Cerrar todas las sesiones libres (al apagar la aplicación)"""
+        self.reap(max_idle=0)
+
+
+# Pool compartido por los servicios
+mikrotik_pool = MikrotikPool()
@@ -1,6 +1,8 @@
 # main.py - VERSIÓN WINDOWS (ACTUALIZADO CON MERCADO PAGO)
 import sys
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # DEBUG: Mostrar path actual
@@ -21,10 +23,21 @@ except (AttributeError, Exception):
 
 from fastapi import FastAPI, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
+import logging
 from app.core.config import settings
+from app.core.logging_config import setup_logging, shutdown_logging
+from app.services.conekta_service import conekta_service
+from app.services.mercado_pago_service import mercado_pago_service
+from app.services.telegram_service import telegram_service
+from app.core.mikrotik_api import mikrotik_pool
+from app.services.mikrotik_service import mikrotik_service
 from datetime import datetime, timezone
 
+# Logging asíncrono (cola + hilo escritor)
+setup_logging(logging.DEBUG if settings.DEBUG else logging.INFO)
+
 
 print("\n=== CARGANDO MÓDULOS ===")
 
@@ -121,7 +134,8 @@ app = FastAPI(
     ),
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS
@@ -176,6 +190,29 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+
+@app.on_event("startup")
+async def startup_event():
+    # Executor por defecto: to_thread (bcrypt, JSON grandes) y los workers de
+    # app/hotspot y auto_reconnect (run_in_executor(None, ...), sondeos con sleep).
+    # MikroTikService ya no lo usa: tiene su propio executor acotado.
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=settings.BLOCKING_IO_WORKERS)
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Cerrar clientes HTTP compartidos
+    await conekta_service.close()
+    await mercado_pago_service.close()
+    await telegram_service.close()
+    # Cerrar sesiones RouterOS libres
+    mikrotik_service.close()
+    mikrotik_pool.close_all()
+    shutdown_logging()
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # loop="auto" usa uvloop cuando está instalado (uvicorn[standard], no Windows)
+    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True, loop="auto")
\ No newline at end of file
@@ -1,4 +1,5 @@
 # app/services/auth_service.py - VERSIÓN COMPLETA Y CORREGIDA
+import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from datetime import datetime, timedelta
@@ -39,7 +40,9 @@ class AuthService:
         
         # 2. Verificar contraseña
         try:
-            password_valid = bcrypt.checkpw(
+            # bcrypt es CPU-bound (~250 ms): no bloquear el event loop
+            password_valid = await asyncio.to_thread(
+                bcrypt.checkpw,
                 login_data.password.encode('utf-8'),
                 usuario.password_hash.encode('utf-8')
             )
@@ -1,188 +1,259 @@
 # app/services/conekta_service.py - VERSIÓN COMPLETA CON TODOS LOS ERRORES
-import aiohttp
 import asyncio
 import base64
+import functools
 import json
 import logging
-from typing import Dict, Any, Optional
+import re
+import httpx
+from decimal import Decimal, ROUND_HALF_EVEN
+from typing import Dict, Any, Optional, Union
 from fastapi import HTTPException, status
 
 logger = logging.getLogger(__name__)
 
+# Metadata vacía compartida (sólo lectura): evita crear un dict nuevo por pago.
+# No se usa MappingProxyType porque json.dumps no sabe serializarlo.
+_EMPTY_METADATA: Dict[str, Any] = {}
+
+_CENTS = Decimal("100")
+
+# Todo lo que no sea dígito (limpieza de teléfonos en C)
+_NON_DIGIT_RE = re.compile(r"\D+")
+
+
+def _to_cents(amount: Union[Decimal, float, int, str]) -> int:
+    """Convertir un monto a centavos con aritmética decimal (int(0.29 * 100) == 28)"""
+    if isinstance(amount, int):
+        return amount * 100
+    return int((Decimal(str(amount)) * _CENTS).to_integral_value(ROUND_HALF_EVEN))
+
+
+# Respuestas más grandes que esto se decodifican en un hilo para no frenar el event loop
+_JSON_OFFLOAD_THRESHOLD = 4096
+
+
+async def _json_loads(raw: bytes) -> Any:
+    """Decodificar JSON; las respuestas grandes se procesan fuera del event loop"""
+    if len(raw) > _JSON_OFFLOAD_THRESHOLD:
+        return await asyncio.to_thread(json.loads, raw)
+    return json.loads(raw)
+
+# 🎯 MAPEO COMPLETO DE ERRORES DE CONEKTA
+# Basado en: https://developers.conekta.com/reference/errores
+CONEKTA_ERRORS = {
+    # ======================
+    # ERRORES DE PROCESAMIENTO (40x)
+    # ======================
+    "processing_error": {
+        "message": "Error al procesar el pago.",
+        "user_message": "Error al procesar el pago. Intente nuevamente."
+    },
+    
+    # Tokenización
+    "conekta.errors.processing.tokenization.used": {
+        "message": "The token has already been used.",
+        "user_message": "El token de tarjeta ya fue utilizado. Genere un nuevo token."
+    },
+    "conekta.errors.processing.tokenization.invalid": {
+        "message": "Invalid token.",
+        "user_message": "Token de tarjeta inválido. Genere un nuevo token."
+    },
+    "conekta.errors.processing.tokenization.expired": {
+        "message": "Token expired.",
+        "user_message": "Token de tarjeta expirado. Genere un nuevo token."
+    },
+    
+    # Tarjetas
+    "card_declined": {
+        "message": "Card was declined.",
+        "user_message": "Tarjeta declinada. Contacte a su banco."
+    },
+    "insufficient_funds": {
+        "message": "Insufficient funds.",
+        "user_message": "Fondos insuficientes en la tarjeta."
+    },
+    "expired_card": {
+        "message": "Expired card.",
+        "user_message": "Tarjeta expirada. Use otra tarjeta."
+    },
+    "invalid_card": {
+        "message": "Invalid card.",
+        "user_message": "Tarjeta inválida. Verifique los datos."
+    },
+    "stolen_card": {
+        "message": "Stolen card.",
+        "user_message": "Tarjeta reportada como robada."
+    },
+    "suspected_fraud": {
+        "message": "Suspected fraud.",
+        "user_message": "Actividad sospechosa detectada."
+    },
+    "card_not_supported": {
+        "message": "Card not supported.",
+        "user_message": "Tarjeta no soportada."
+    },
+    "card_number_incorrect": {
+        "message": "Card number incorrect.",
+        "user_message": "Número de tarjeta incorrecto."
+    },
+    "cvv_incorrect": {
+        "message": "CVV incorrect.",
+        "user_message": "Código de seguridad (CVV) incorrecto."
+    },
+    
+    # ======================
+    # ERRORES DE VALIDACIÓN (30x)
+    # ======================
+    "parameter_validation_error": {
+        "message": "Parameter validation error.",
+        "user_message": "Datos inválidos en la solicitud."
+    },
+    "invalid_parameter": {
+        "message": "Invalid parameter.",
+        "user_message": "Parámetro inválido."
+    },
+    "missing_parameter": {
+        "message": "Missing parameter.",
+        "user_message": "Falta parámetro requerido."
+    },
+    "invalid_amount": {
+        "message": "Invalid amount.",
+        "user_message": "Monto inválido."
+    },
+    "invalid_currency": {
+        "message": "Invalid currency.",
+        "user_message": "Moneda inválida."
+    },
+    "invalid_email": {
+        "message": "Invalid email.",
+        "user_message": "Correo electrónico inválido."
+    },
+    "invalid_phone": {
+        "message": "Invalid phone.",
+        "user_message": "Número de teléfono inválido."
+    },
+    
+    # ======================
+    # ERRORES DE AUTENTICACIÓN (20x)
+    # ======================
+    "authentication_error": {
+        "message": "Authentication error.",
+        "user_message": "Error de autenticación. Contacte al administrador."
+    },
+    "invalid_api_key": {
+        "message": "Invalid API key.",
+        "user_message": "Clave API inválida."
+    },
+    "unauthorized_request": {
+        "message": "Unauthorized request.",
+        "user_message": "No autorizado."
+    },
+    
+    # ======================
+    # ERRORES DE RECURSO (10x)
+    # ======================
+    "resource_not_found": {
+        "message": "Resource not found.",
+        "user_message": "Recurso no encontrado."
+    },
+    "order_not_found": {
+        "message": "Order not found.",
+        "user_message": "Orden no encontrada."
+    },
+    "customer_not_found": {
+        "message": "Customer not found.",
+        "user_message": "Cliente no encontrado."
+    },
+    
+    # ======================
+    # ERRORES DE GATEWAY (50x)
+    # ======================
+    "gateway_error": {
+        "message": "Gateway error.",
+        "user_message": "Error en el procesador de pagos."
+    },
+    "bank_connection_error": {
+        "message": "Bank connection error.",
+        "user_message": "Error de conexión con el banco."
+    },
+    "server_error": {
+        "message": "Server error.",
+        "user_message": "Error interno del servidor."
+    },
+    
+    # ======================
+    # ERRORES DE LÍMITE
+    # ======================
+    "rate_limit_exceeded": {
+        "message": "Rate limit exceeded.",
+        "user_message": "Límite de solicitudes excedido. Espere un momento."
+    },
+    "quota_exceeded": {
+        "message": "Quota exceeded.",
+        "user_message": "Cuota excedida. Contacte a Conekta."
+    },
+    
+    # ======================
+    # DEFAULT
+    # ======================
+    "default": {
+        "message": "Unknown error.",
+        "user_message": "Error al procesar el pago. Intente nuevamente."
+    }
+}
+
+
 class ConektaService:
     """Servicio para procesar pagos con Conekta - TODOS LOS ERRORES"""
     
     BASE_URL = "https://api.conekta.io"
     
-    # 🎯 MAPEO COMPLETO DE ERRORES DE CONEKTA
-    # Basado en: https://developers.conekta.com/reference/errores
-    CONEKTA_ERRORS = {
-        # ======================
-        # ERRORES DE PROCESAMIENTO (40x)
-        # ======================
-        "processing_error": {
-            "message": "Error al procesar el pago.",
-            "user_message": "Error al procesar el pago. Intente nuevamente."
-        },
-        
-        # Tokenización
-        "conekta.errors.processing.tokenization.used": {
-            "message": "The token has already been used.",
-            "user_message": "El token de tarjeta ya fue utilizado. Genere un nuevo token."
-        },
-        "conekta.errors.processing.tokenization.invalid": {
-            "message": "Invalid token.",
-            "user_message": "Token de tarjeta inválido. Genere un nuevo token."
-        },
-        "conekta.errors.processing.tokenization.expired": {
-            "message": "Token expired.",
-            "user_message": "Token de tarjeta expirado. Genere un nuevo token."
-        },
-        
-        # Tarjetas
-        "card_declined": {
-            "message": "Card was declined.",
-            "user_message": "Tarjeta declinada. Contacte a su banco."
-        },
-        "insufficient_funds": {
-            "message": "Insufficient funds.",
-            "user_message": "Fondos insuficientes en la tarjeta."
-        },
-        "expired_card": {
-            "message": "Expired card.",
-            "user_message": "Tarjeta expirada. Use otra tarjeta."
-        },
-        "invalid_card": {
-            "message": "Invalid card.",
-            "user_message": "Tarjeta inválida. Verifique los datos."
-        },
-        "stolen_card": {
-            "message": "Stolen card.",
-            "user_message": "Tarjeta reportada como robada."
-        },
-        "suspected_fraud": {
-            "message": "Suspected fraud.",
-            "user_message": "Actividad sospechosa detectada."
-        },
-        "card_not_supported": {
-            "message": "Card not supported.",
-            "user_message": "Tarjeta no soportada."
-        },
-        "card_number_incorrect": {
-            "message": "Card number incorrect.",
-            "user_message": "Número de tarjeta incorrecto."
-        },
-        "cvv_incorrect": {
-            "message": "CVV incorrect.",
-            "user_message": "Código de seguridad (CVV) incorrecto."
-        },
-        
-        # ======================
-        # ERRORES DE VALIDACIÓN (30x)
-        # ======================
-        "parameter_validation_error": {
-            "message": "Parameter validation error.",
-            "user_message": "Datos inválidos en la solicitud."
-        },
-        "invalid_parameter": {
-            "message": "Invalid parameter.",
-            "user_message": "Parámetro inválido."
-        },
-        "missing_parameter": {
-            "message": "Missing parameter.",
-            "user_message": "Falta parámetro requerido."
-        },
-        "invalid_amount": {
-            "message": "Invalid amount.",
-            "user_message": "Monto inválido."
-        },
-        "invalid_currency": {
-            "message": "Invalid currency.",
-            "user_message": "Moneda inválida."
-        },
-        "invalid_email": {
-            "message": "Invalid email.",
-            "user_message": "Correo electrónico inválido."
-        },
-        "invalid_phone": {
-            "message": "Invalid phone.",
-            "user_message": "Número de teléfono inválido."
-        },
-        
-        # ======================
-        # ERRORES DE AUTENTICACIÓN (20x)
-        # ======================
-        "authentication_error": {
-            "message": "Authentication error.",
-            "user_message": "Error de autenticación. Contacte al administrador."
-        },
-        "invalid_api_key": {
-            "message": "Invalid API key.",
-            "user_message": "Clave API inválida."
-        },
-        "unauthorized_request": {
-            "message": "Unauthorized request.",
-            "user_message": "No autorizado."
-        },
-        
-        # ======================
-        # ERRORES DE RECURSO (10x)
-        # ======================
-        "resource_not_found": {
-            "message": "Resource not found.",
-            "user_message": "Recurso no encontrado."
-        },
-        "order_not_found": {
-            "message": "Order not found.",
-            "user_message": "Orden no encontrada."
-        },
-        "customer_not_found": {
-            "message": "Customer not found.",
-            "user_message": "Cliente no encontrado."
-        },
-        
-        # ======================
-        # ERRORES DE GATEWAY (50x)
-        # ======================
-        "gateway_error": {
-            "message": "Gateway error.",
-            "user_message": "Error en el procesador de pagos."
-        },
-        "bank_connection_error": {
-            "message": "Bank connection error.",
-            "user_message": "Error de conexión con el banco."
-        },
-        "server_error": {
-            "message": "Server error.",
-            "user_message": "Error interno del servidor."
-        },
-        
-        # ======================
-        # ERRORES DE LÍMITE
-        # ======================
-        "rate_limit_exceeded": {
-            "message": "Rate limit exceeded.",
-            "user_message": "Límite de solicitudes excedido. Espere un momento."
-        },
-        "quota_exceeded": {
-            "message": "Quota exceeded.",
-            "user_message": "Cuota excedida. Contacte a Conekta."
-        },
-        
-        # ======================
-        # DEFAULT
-        # ======================
-        "default": {
-            "message": "Unknown error.",
-            "user_message": "Error al procesar el pago. Intente nuevamente."
-        }
+    # Máximo de llamadas simultáneas a Conekta (igual al pool keep-alive)
+    MAX_CONCURRENT_REQUESTS = 50
+    
+    _BASE_HEADERS = {
+        "Accept": "application/vnd.conekta-v2.1.0+json",
+        "Content-Type": "application/json",
+        "User-Agent": "MikroTik-Payment-API/1.0"
     }
 
+    def __init__(self):
+        # Cliente HTTP/2 compartido: multiplexa pagos concurrentes sobre una conexión TLS
+        self._client: Optional[httpx.AsyncClient] = None
+        # Backpressure: los picos de tráfico esperan aquí en lugar de abrir sockets sin límite
+        self._sem = asyncio.Semaphore(self.MAX_CONCURRENT_REQUESTS)
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _auth_header(private_key: str) -> str:
+        """Header Basic Auth por llave privada (cacheado; LRU acota llaves rotadas)"""
+        return "Basic " + base64.b64encode(f"{private_key}:".encode()).decode()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Obtener (o crear) el cliente HTTP reutilizable"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                timeout=30.0,
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=self.MAX_CONCURRENT_REQUESTS
+                )
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """Cerrar el cliente HTTP (al apagar la aplicación)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
     async def create_order(
         self,
         private_key: str,
         mode: str,
-        amount: float,
+        amount: Union[Decimal, float, str],
         currency: str,
         card_token: str,
         customer_info: Dict[str, Any],
@@ -191,7 +262,7 @@ class ConektaService:
     ) -> Dict[str, Any]:
         """Crear orden de pago en Conekta - MANEJO COMPLETO DE ERRORES"""
         
-        print(f"🔍 [CONEKTA] Iniciando pago...")
+        logger.info("🔍 [CONEKTA] Iniciando pago...")
         
         try:
             # Validaciones básicas
@@ -205,7 +276,7 @@ class ConektaService:
             normalized_phone = self._normalize_phone(customer_info.get("telefono", ""))
             
             url = f"{self.BASE_URL}/orders"
-            amount_cents = int(amount * 100)
+            amount_cents = _to_cents(amount)
             
             payload = {
                 "currency": currency.upper(),
@@ -225,103 +296,93 @@ class ConektaService:
                         "token_id": card_token
                     }
                 }],
-                "metadata": metadata or {}
+                "metadata": metadata or _EMPTY_METADATA
             }
             
-            auth_str = f"{private_key}:"
-            auth_b64 = base64.b64encode(auth_str.encode()).decode()
+            headers = {**self._BASE_HEADERS, "Authorization": self._auth_header(private_key)}
             
-            headers = {
-                "Accept": "application/vnd.conekta-v2.1.0+json",
-                "Content-Type": "application/json",
-                "Authorization": f"Basic {auth_b64}",
-                "User-Agent": "MikroTik-Payment-API/1.0"
-            }
+            body = json.dumps(payload)
+            async with self._sem:
+                resp = await self._get_client().post(url, content=body, headers=headers)
+            
+            status_code = resp.status_code
+            raw = resp.content
+            
+            # Log para debugging
+            if status_code != 200:
+                logger.warning("❌ Conekta Status: %s | Respuesta: %.500s", status_code, resp.text)
+            
+            # Parsear respuesta
+            try:
+                data = await _json_loads(raw) if raw else {}
+            except json.JSONDecodeError:
+                data = {"raw_response": resp.text}
             
-            timeout = aiohttp.ClientTimeout(total=30)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            # ✅ Éxito
+            if status_code == 200:
+                logger.info("✅ Pago exitoso - ID: %s", data.get("id"))
+                
+                # Validar que el pago realmente está "paid"
+                payment_status = data.get("payment_status", "").lower()
+                if payment_status != "paid":
+                    logger.warning("⚠️  Estado inesperado: %s", payment_status)
+                    # Aún así retornamos, pero el endpoint hará validación adicional
+                
+                return {
+                    "order_id": data.get("id"),
+                    "payment_status": data.get("payment_status", ""),
+                    "amount": data.get("amount", 0) / 100,
+                    "currency": data.get("currency"),
+                    "created_at": data.get("created_at"),
+                    "customer_info": data.get("customer_info", {})
+                }
+            
+            # ❌ Error - Manejo completo
+            else:
+                error_info = self._parse_conekta_error_response(data, status_code)
+                
+                logger.warning("❌ Error Conekta: %s - %s", error_info["code"], error_info["user_message"])
+                
+                # Lanzar excepción apropiada
+                if status_code == 402:
+                    raise HTTPException(
+                        status_code=status.HTTP_402_PAYMENT_REQUIRED,
+                        detail=error_info["user_message"]
+                    )
+                elif status_code == 400:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=error_info["user_message"]
+                    )
+                elif status_code == 401:
+                    raise HTTPException(
+                        status_code=status.HTTP_401_UNAUTHORIZED,
+                        detail=error_info["user_message"]
+                    )
+                elif status_code == 404:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail=error_info["user_message"]
+                    )
+                elif status_code == 422:
+                    raise HTTPException(
+                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        detail=error_info["user_message"]
+                    )
+                elif status_code == 429:
+                    raise HTTPException(
+                        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                        detail=error_info["user_message"]
+                    )
+                else:
+                    raise HTTPException(
+                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                        detail=error_info["user_message"]
+                    )
                 
-                async with session.post(url, json=payload, headers=headers) as resp:
-                    
-                    response_text = await resp.text()
-                    status_code = resp.status
-                    
-                    # Log para debugging
-                    if status_code != 200:
-                        print(f"❌ Conekta Status: {status_code}")
-                        print(f"📄 Respuesta: {response_text[:500]}")
-                    
-                    # Parsear respuesta
-                    try:
-                        data = json.loads(response_text) if response_text else {}
-                    except json.JSONDecodeError:
-                        data = {"raw_response": response_text}
-                    
-                    # ✅ Éxito
-                    if status_code == 200:
-                        print(f"✅ Pago exitoso - ID: {data.get('id')}")
-                        
-                        # Validar que el pago realmente está "paid"
-                        payment_status = data.get("payment_status", "").lower()
-                        if payment_status != "paid":
-                            print(f"⚠️  Estado inesperado: {payment_status}")
-                            # Aún así retornamos, pero el endpoint hará validación adicional
-                        
-                        return {
-                            "order_id": data.get("id"),
-                            "payment_status": data.get("payment_status", ""),
-                            "amount": data.get("amount", 0) / 100,
-                            "currency": data.get("currency"),
-                            "created_at": data.get("created_at"),
-                            "customer_info": data.get("customer_info", {})
-                        }
-                    
-                    # ❌ Error - Manejo completo
-                    else:
-                        error_info = self._parse_conekta_error_response(data, status_code)
-                        
-                        print(f"❌ Error Conekta: {error_info['code']} - {error_info['user_message']}")
-                        
-                        # Lanzar excepción apropiada
-                        if status_code == 402:
-                            raise HTTPException(
-                                status_code=status.HTTP_402_PAYMENT_REQUIRED,
-                                detail=error_info["user_message"]
-                            )
-                        elif status_code == 400:
-                            raise HTTPException(
-                                status_code=status.HTTP_400_BAD_REQUEST,
-                                detail=error_info["user_message"]
-                            )
-                        elif status_code == 401:
-                            raise HTTPException(
-                                status_code=status.HTTP_401_UNAUTHORIZED,
-                                detail=error_info["user_message"]
-                            )
-                        elif status_code == 404:
-                            raise HTTPException(
-                                status_code=status.HTTP_404_NOT_FOUND,
-                                detail=error_info["user_message"]
-                            )
-                        elif status_code == 422:
-                            raise HTTPException(
-                                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                                detail=error_info["user_message"]
-                            )
-                        elif status_code == 429:
-                            raise HTTPException(
-                                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                                detail=error_info["user_message"]
-                            )
-                        else:
-                            raise HTTPException(
-                                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                                detail=error_info["user_message"]
-                            )
-                        
-        except asyncio.TimeoutError:
+        except (asyncio.TimeoutError, httpx.TimeoutException):
             error_msg = "Tiempo de espera agotado al conectar con Conekta."
-            print(f"⏰ {error_msg}")
+            logger.warning("⏰ %s", error_msg)
             raise HTTPException(
                 status_code=status.HTTP_504_GATEWAY_TIMEOUT,
                 detail="Tiempo de espera agotado. Intente nuevamente."
@@ -330,9 +391,10 @@ class ConektaService:
             raise  # Re-lanzar excepciones HTTP ya manejadas
         except Exception as e:
             error_msg = "Error interno al procesar el pago."
-            print(f"💥 Error inesperado: {type(e).__name__}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.exception("💥 Error inesperado en Conekta: %s", type(e).__name__)
+            else:
+                logger.error("💥 Error inesperado en Conekta: %s: %s", type(e).__name__, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=error_msg
@@ -345,9 +407,10 @@ class ConektaService:
         Returns:
             Dict con: {"code": "error_code", "message": "msg técnico", "user_message": "msg para usuario"}
         """
+        CE = CONEKTA_ERRORS
         error_code = "default"
         technical_message = "Unknown error"
-        user_message = self.CONEKTA_ERRORS["default"]["user_message"]
+        user_message = CE["default"]["user_message"]
         
         # 1. Extraer código de error
         if "details" in data and isinstance(data["details"], list) and data["details"]:
@@ -373,14 +436,14 @@ class ConektaService:
         
         # Buscar coincidencia exacta o parcial
         matched_error = None
-        for known_error in self.CONEKTA_ERRORS:
+        for known_error in CE:
             if known_error in error_code_lower or error_code_lower in known_error:
                 matched_error = known_error
                 break
         
         # 3. Obtener mensajes
-        if matched_error and matched_error in self.CONEKTA_ERRORS:
-            error_info = self.CONEKTA_ERRORS[matched_error]
+        if matched_error and matched_error in CE:
+            error_info = CE[matched_error]
             user_message = error_info["user_message"]
         else:
             # Si no encontramos coincidencia, intentar deducir del mensaje
@@ -388,30 +451,30 @@ class ConektaService:
             
             if any(word in tech_lower for word in ["token", "tokenization"]):
                 if "already" in tech_lower or "used" in tech_lower:
-                    user_message = self.CONEKTA_ERRORS["conekta.errors.processing.tokenization.used"]["user_message"]
+                    user_message = CE["conekta.errors.processing.tokenization.used"]["user_message"]
                 elif "invalid" in tech_lower:
-                    user_message = self.CONEKTA_ERRORS["conekta.errors.processing.tokenization.invalid"]["user_message"]
+                    user_message = CE["conekta.errors.processing.tokenization.invalid"]["user_message"]
                 elif "expired" in tech_lower:
-                    user_message = self.CONEKTA_ERRORS["conekta.errors.processing.tokenization.expired"]["user_message"]
+                    user_message = CE["conekta.errors.processing.tokenization.expired"]["user_message"]
             
             elif "card" in tech_lower or "tarjeta" in tech_lower:
                 if "declined" in tech_lower or "rechazada" in tech_lower:
-                    user_message = self.CONEKTA_ERRORS["card_declined"]["user_message"]
+                    user_message = CE["card_declined"]["user_message"]
                 elif "insufficient" in tech_lower or "fondos" in tech_lower:
-                    user_message = self.CONEKTA_ERRORS["insufficient_funds"]["user_message"]
+                    user_message = CE["insufficient_funds"]["user_message"]
                 elif "expired" in tech_lower or "expirada" in tech_lower:
-                    user_message = self.CONEKTA_ERRORS["expired_card"]["user_message"]
+                    user_message = CE["expired_card"]["user_message"]
                 elif "invalid" in tech_lower or "inválida" in tech_lower:
-                    user_message = self.CONEKTA_ERRORS["invalid_card"]["user_message"]
+                    user_message = CE["invalid_card"]["user_message"]
             
             elif "funds" in tech_lower:
-                user_message = self.CONEKTA_ERRORS["insufficient_funds"]["user_message"]
+                user_message = CE["insufficient_funds"]["user_message"]
             
             elif "authentication" in tech_lower or "auth" in tech_lower:
-                user_message = self.CONEKTA_ERRORS["authentication_error"]["user_message"]
+                user_message = CE["authentication_error"]["user_message"]
             
             elif "parameter" in tech_lower or "validation" in tech_lower:
-                user_message = self.CONEKTA_ERRORS["parameter_validation_error"]["user_message"]
+                user_message = CE["parameter_validation_error"]["user_message"]
         
         return {
             "code": error_code,
@@ -424,7 +487,7 @@ class ConektaService:
         if not phone:
             return "+521234567890"
             
-        digits = ''.join(filter(str.isdigit, phone))
+        digits = _NON_DIGIT_RE.sub("", phone)
         
         if len(digits) == 12 and digits.startswith('52'):
             return f"+{digits}"
@@ -1,195 +1,363 @@
 # app/services/mercado_pago_service.py
-import mercadopago
+import asyncio
+import base64
+import functools
+import hashlib
+import hmac
 import json
-import uuid
+import os
+import random
+import re
+import secrets
+import time
 import logging
-from datetime import datetime
-from typing import Dict, Any, Optional, List
+import httpx
+from cachetools import TTLCache
+from types import MappingProxyType
+from typing import Dict, Any, Final, Optional, List, Mapping, NamedTuple
 from fastapi import HTTPException, status
 from urllib.parse import urljoin
 
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional; sólo acelera los dumps de debug
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# Todo lo que no sea dígito (limpieza de teléfonos en C)
+_NON_DIGIT_RE = re.compile(r"\D+")
+
+# Mapping vacío compartido (sólo lectura) para lecturas opcionales sin crear {}
+_EMPTY: Final[Mapping[str, Any]] = MappingProxyType({})
+
+def _dumps_debug(obj: Any) -> str:
+    """Serializar un objeto legible para logs de DEBUG (orjson si está disponible)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2, default=str).decode()
+    return json.dumps(obj, indent=2, default=str)
+
+
+def _idempotency_key() -> str:
+    """Llave de idempotencia aleatoria de 128 bits (26 chars base32, sin objeto UUID)"""
+    return base64.b32encode(os.urandom(16)).decode("ascii").rstrip("=")
+
+
+# Campos constantes del payload de pago (se combinan con los datos de cada pago)
+_PAYLOAD_TEMPLATE: Final[Mapping[str, Any]] = MappingProxyType({
+    # 🟡 MEJORAS
+    "statement_descriptor": "HOTSPOT WIFI",
+    "binary_mode": True
+})
+
+
+class MPError(NamedTuple):
+    """Entrada del catálogo de errores de Mercado Pago (inmutable, acceso por atributo)"""
+    message: str
+    user_message: str
+    categoria: str
+    severidad: str
+    code: str = ""
+
+
+# 🎯 MAPEO COMPLETO DE ERRORES DE MERCADO PAGO
+_MP_ERROR_TABLE: Dict[str, MPError] = {
+    # ======================
+    # ERRORES DE FONDOS Y TARJETAS
+    # ======================
+    "cc_rejected_insufficient_amount": MPError(
+        "Fondos insuficientes",
+        "❌ Fondos insuficientes en la tarjeta.",
+        "fondos", "alta"
+    ),
+    "cc_rejected_bad_filled_card_number": MPError(
+        "Número de tarjeta incorrecto",
+        "❌ Número de tarjeta incorrecto. Verifique los datos.",
+        "datos", "media"
+    ),
+    "cc_rejected_bad_filled_date": MPError(
+        "Fecha de vencimiento incorrecta",
+        "❌ Fecha de vencimiento incorrecta.",
+        "datos", "media"
+    ),
+    "cc_rejected_bad_filled_security_code": MPError(
+        "CVV incorrecto",
+        "❌ Código de seguridad (CVV) incorrecto.",
+        "datos", "media"
+    ),
+    "cc_rejected_high_risk": MPError(
+        "Alto riesgo",
+        "⚠️ Pago rechazado por políticas de seguridad.",
+        "seguridad", "alta"
+    ),
+    "cc_rejected_card_disabled": MPError(
+        "Tarjeta deshabilitada",
+        "❌ Tarjeta deshabilitada. Contacte a su banco.",
+        "tarjeta", "alta"
+    ),
+    "cc_rejected_blacklist": MPError(
+        "Tarjeta en lista negra",
+        "❌ No se puede procesar el pago con esta tarjeta.",
+        "tarjeta", "alta"
+    ),
+    "cc_rejected_card_error": MPError(
+        "Error en tarjeta",
+        "❌ Error al procesar la tarjeta. Intente nuevamente.",
+        "tarjeta", "media"
+    ),
+    "cc_rejected_duplicated_payment": MPError(
+        "Pago duplicado",
+        "⚠️ Este pago ya fue procesado anteriormente.",
+        "duplicado", "media"
+    ),
+    "cc_rejected_call_for_authorize": MPError(
+        "Requiere autorización",
+        "⚠️ El pago requiere autorización del banco.",
+        "autorizacion", "media"
+    ),
+    "cc_rejected_max_attempts": MPError(
+        "Máximo de intentos excedido",
+        "⏰ Máximo de intentos excedido. Espere e intente más tarde.",
+        "intentos", "alta"
+    ),
+    "cc_rejected_other_reason": MPError(
+        "Tarjeta rechazada",
+        "❌ Tarjeta rechazada. Contacte a su banco.",
+        "general", "alta"
+    ),
+
+    # ======================
+    # ERRORES DE VALIDACIÓN
+    # ======================
+    "invalid_payment_method": MPError(
+        "Método de pago inválido",
+        "❌ Método de pago inválido.",
+        "validacion", "media"
+    ),
+    "invalid_token": MPError(
+        "Token inválido",
+        "❌ Token de pago inválido o expirado.",
+        "token", "alta"
+    ),
+    "invalid_user": MPError(
+        "Usuario inválido",
+        "❌ Información del pagador inválida.",
+        "validacion", "media"
+    ),
+    "invalid_installments": MPError(
+        "Cuotas inválidas",
+        "❌ Número de cuotas no válido para esta tarjeta.",
+        "validacion", "media"
+    ),
+
+    # ======================
+    # ERRORES DE PROCESAMIENTO
+    # ======================
+    "pending_contingency": MPError(
+        "Pago pendiente",
+        "⏳ El pago está pendiente de confirmación.",
+        "pendiente", "baja"
+    ),
+    "pending_review_manual": MPError(
+        "Pendiente de revisión manual",
+        "⏳ El pago está siendo revisado manualmente.",
+        "pendiente", "baja"
+    ),
+    "pending_waiting_payment": MPError(
+        "Esperando pago",
+        "⏳ Esperando confirmación del pago.",
+        "pendiente", "baja"
+    ),
+
+    # ======================
+    # ERRORES DE AUTENTICACIÓN
+    # ======================
+    "authentication_error": MPError(
+        "Error de autenticación",
+        "🔐 Error de autenticación con Mercado Pago.",
+        "auth", "alta"
+    ),
+    "invalid_access_token": MPError(
+        "Token de acceso inválido",
+        "🔐 Credenciales de Mercado Pago inválidas.",
+        "auth", "alta"
+    ),
+
+    # ======================
+    # DEFAULT
+    # ======================
+    "default": MPError(
+        "Error al procesar el pago",
+        "❌ Error al procesar el pago. Intente nuevamente.",
+        "general", "alta"
+    )
+}
+
+# Cada entrada ya con su "code", así _parse_mp_error la devuelve tal cual;
+# de sólo lectura para que nadie mute el catálogo compartido
+_MP_ERRORS: Final[Mapping[str, MPError]] = MappingProxyType({
+    code: info._replace(code=code) for code, info in _MP_ERROR_TABLE.items()
+})
+# Respuesta compartida para status_detail vacío
+_MP_UNKNOWN_ERROR = _MP_ERRORS["default"]._replace(code="unknown")
+
+# Todos los códigos conocidos en una sola alternancia; al ordenarlos del más largo
+# al más corto, .match() devuelve el prefijo conocido más largo
+_MP_ERROR_PATTERN = re.compile("|".join(
+    re.escape(code)
+    for code in sorted(_MP_ERRORS, key=len, reverse=True)
+    if code != "default"
+))
+
+
 class MercadoPagoService:
     """Servicio para procesar pagos con Mercado Pago - CON TODOS LOS REQUISITOS"""
     
-    # 🎯 MAPEO COMPLETO DE ERRORES DE MERCADO PAGO
-    MP_ERRORS = {
-        # ======================
-        # ERRORES DE FONDOS Y TARJETAS
-        # ======================
-        "cc_rejected_insufficient_amount": {
-            "message": "Fondos insuficientes",
-            "user_message": "❌ Fondos insuficientes en la tarjeta.",
-            "categoria": "fondos",
-            "severidad": "alta"
-        },
-        "cc_rejected_bad_filled_card_number": {
-            "message": "Número de tarjeta incorrecto",
-            "user_message": "❌ Número de tarjeta incorrecto. Verifique los datos.",
-            "categoria": "datos",
-            "severidad": "media"
-        },
-        "cc_rejected_bad_filled_date": {
-            "message": "Fecha de vencimiento incorrecta",
-            "user_message": "❌ Fecha de vencimiento incorrecta.",
-            "categoria": "datos",
-            "severidad": "media"
-        },
-        "cc_rejected_bad_filled_security_code": {
-            "message": "CVV incorrecto",
-            "user_message": "❌ Código de seguridad (CVV) incorrecto.",
-            "categoria": "datos",
-            "severidad": "media"
-        },
-        "cc_rejected_high_risk": {
-            "message": "Alto riesgo",
-            "user_message": "⚠️ Pago rechazado por políticas de seguridad.",
-            "categoria": "seguridad",
-            "severidad": "alta"
-        },
-        "cc_rejected_card_disabled": {
-            "message": "Tarjeta deshabilitada",
-            "user_message": "❌ Tarjeta deshabilitada. Contacte a su banco.",
-            "categoria": "tarjeta",
-            "severidad": "alta"
-        },
-        "cc_rejected_blacklist": {
-            "message": "Tarjeta en lista negra",
-            "user_message": "❌ No se puede procesar el pago con esta tarjeta.",
-            "categoria": "tarjeta",
-            "severidad": "alta"
-        },
-        "cc_rejected_card_error": {
-            "message": "Error en tarjeta",
-            "user_message": "❌ Error al procesar la tarjeta. Intente nuevamente.",
-            "categoria": "tarjeta",
-            "severidad": "media"
-        },
-        "cc_rejected_duplicated_payment": {
-            "message": "Pago duplicado",
-            "user_message": "⚠️ Este pago ya fue procesado anteriormente.",
-            "categoria": "duplicado",
-            "severidad": "media"
-        },
-        "cc_rejected_call_for_authorize": {
-            "message": "Requiere autorización",
-            "user_message": "⚠️ El pago requiere autorización del banco.",
-            "categoria": "autorizacion",
-            "severidad": "media"
-        },
-        "cc_rejected_max_attempts": {
-            "message": "Máximo de intentos excedido",
-            "user_message": "⏰ Máximo de intentos excedido. Espere e intente más tarde.",
-            "categoria": "intentos",
-            "severidad": "alta"
-        },
-        "cc_rejected_other_reason": {
-            "message": "Tarjeta rechazada",
-            "user_message": "❌ Tarjeta rechazada. Contacte a su banco.",
-            "categoria": "general",
-            "severidad": "alta"
-        },
-        
-        # ======================
-        # ERRORES DE VALIDACIÓN
-        # ======================
-        "invalid_payment_method": {
-            "message": "Método de pago inválido",
-            "user_message": "❌ Método de pago inválido.",
-            "categoria": "validacion",
-            "severidad": "media"
-        },
-        "invalid_token": {
-            "message": "Token inválido",
-            "user_message": "❌ Token de pago inválido o expirado.",
-            "categoria": "token",
-            "severidad": "alta"
-        },
-        "invalid_user": {
-            "message": "Usuario inválido",
-            "user_message": "❌ Información del pagador inválida.",
-            "categoria": "validacion",
-            "severidad": "media"
-        },
-        "invalid_installments": {
-            "message": "Cuotas inválidas",
-            "user_message": "❌ Número de cuotas no válido para esta tarjeta.",
-            "categoria": "validacion",
-            "severidad": "media"
-        },
-        
-        # ======================
-        # ERRORES DE PROCESAMIENTO
-        # ======================
-        "pending_contingency": {
-            "message": "Pago pendiente",
-            "user_message": "⏳ El pago está pendiente de confirmación.",
-            "categoria": "pendiente",
-            "severidad": "baja"
-        },
-        "pending_review_manual": {
-            "message": "Pendiente de revisión manual",
-            "user_message": "⏳ El pago está siendo revisado manualmente.",
-            "categoria": "pendiente",
-            "severidad": "baja"
-        },
-        "pending_waiting_payment": {
-            "message": "Esperando pago",
-            "user_message": "⏳ Esperando confirmación del pago.",
-            "categoria": "pendiente",
-            "severidad": "baja"
-        },
-        
-        # ======================
-        # ERRORES DE AUTENTICACIÓN
-        # ======================
-        "authentication_error": {
-            "message": "Error de autenticación",
-            "user_message": "🔐 Error de autenticación con Mercado Pago.",
-            "categoria": "auth",
-            "severidad": "alta"
-        },
-        "invalid_access_token": {
-            "message": "Token de acceso inválido",
-            "user_message": "🔐 Credenciales de Mercado Pago inválidas.",
-            "categoria": "auth",
-            "severidad": "alta"
-        },
-        
-        # ======================
-        # DEFAULT
-        # ======================
-        "default": {
-            "message": "Error al procesar el pago",
-            "user_message": "❌ Error al procesar el pago. Intente nuevamente.",
-            "categoria": "general",
-            "severidad": "alta"
-        }
-    }
+    PAYMENTS_URL = "https://api.mercadopago.com/v1/payments"
+    
+    # Reintentos ante fallas transitorias (seguros gracias al X-Idempotency-Key)
+    RETRY_ATTEMPTS = 3
+    RETRY_STATUSES = frozenset({429, 502, 503, 504})
+    MAX_RETRY_DELAY = 5.0
+    # Errores en los que la petición no llegó a enviarse: los únicos que se
+    # reintentan fuera de GET (un ReadTimeout en POST puede ser un cobro hecho)
+    PRE_SEND_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+    
+    # Estados finales: no vuelven a cambiar, se pueden servir desde caché
+    TERMINAL_STATUSES = frozenset({"approved", "rejected", "cancelled", "refunded", "charged_back"})
+    STATUS_CACHE_SIZE = 10_000
+    STATUS_CACHE_TTL = 600
+    # Estados no finales: ventana corta que absorbe polling en ráfaga
+    RECENT_STATUS_TTL = 2.0
+    # Consultas simultáneas por lote en get_payment_statuses
+    BATCH_CONCURRENCY = 20
+    
+    # Única instancia global: sin __dict__, sólo el estado de conexión
+    __slots__ = ("base_url", "notification_url", "_payload_base", "_client", "_sem", "_status_cache", "_recent_status_cache")
 
     def __init__(self, base_url: str = "https://payhotspot.wispremote.com"):
     #def __init__(self, base_url: str = "https://4d686998b1a3.ngrok-free.app"):
         self.base_url = base_url
+        # Constante durante la vida del servicio: se arma una sola vez
+        self.notification_url = urljoin(base_url, "/api/v1/webhook/mercado-pago")
+        # Campos fijos del payload de pago de esta instancia (se combinan en create_payment)
+        self._payload_base: Mapping[str, Any] = MappingProxyType({
+            **_PAYLOAD_TEMPLATE,
+            "notification_url": self.notification_url
+        })
+        # Cliente HTTP compartido (pool keep-alive) en lugar del SDK síncrono
+        self._client: Optional[httpx.AsyncClient] = None
+        # Los picos de pagos esperan aquí en lugar de disparar 429 en Mercado Pago
+        self._sem = asyncio.Semaphore(settings.MP_MAX_CONCURRENCY)
+        # (access_token, payment_id) -> resultado de get_payment_status en estado final
+        self._status_cache: TTLCache = TTLCache(
+            maxsize=self.STATUS_CACHE_SIZE, ttl=self.STATUS_CACHE_TTL
+        )
+        # Igual, para estados no finales (pending, in_process...) con TTL corto
+        self._recent_status_cache: TTLCache = TTLCache(
+            maxsize=self.STATUS_CACHE_SIZE, ttl=self.RECENT_STATUS_TTL
+        )
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _auth_headers(access_token: str) -> Mapping[str, str]:
+        """Headers base por access token (cacheados por empresa, inmutables)"""
+        return MappingProxyType({
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json"
+        })
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Obtener (o crear) el cliente HTTP reutilizable"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=True,  # multiplexa los pagos concurrentes sobre pocas conexiones TLS
+                timeout=httpx.Timeout(10.0),
+                limits=httpx.Limits(
+                    max_connections=200,
+                    max_keepalive_connections=100,
+                    keepalive_expiry=30
+                )
+            )
+        return self._client
+    
+    async def close(self) -> None:
+        """Cerrar el cliente HTTP (al apagar la aplicación)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Llamar a la API de Mercado Pago con reintentos.
+        
+        Reintenta 429/5xx transitorios y errores de red con backoff exponencial
+        con jitter (respetando Retry-After). El semáforo se libera antes de
+        dormir para no bloquear a otros pagos durante la espera.
+        
+        Fuera de GET sólo se reintentan errores de conexión (la petición no
+        salió) y 429/5xx de peticiones con X-Idempotency-Key; cualquier otro
+        error de red se propaga de inmediato.
+        """
+        is_get = method.upper() == "GET"
+        replay_safe = is_get or "X-Idempotency-Key" in (kwargs.get("headers") or {})
+        
+        for attempt in range(self.RETRY_ATTEMPTS):
+            is_last = attempt == self.RETRY_ATTEMPTS - 1
+            retry_after = None
+            try:
+                async with self._sem:
+                    resp = await self._get_client().request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if is_last or not (is_get or isinstance(e, self.PRE_SEND_ERRORS)):
+                    raise
+                reason = type(e).__name__
+            else:
+                if resp.status_code not in self.RETRY_STATUSES or is_last or not replay_safe:
+                    return resp
+                reason = f"HTTP {resp.status_code}"
+                retry_after = resp.headers.get("Retry-After")
+            
+            delay = min(2.0, 0.2 * (2 ** attempt)) + random.uniform(0, 0.1)
+            if retry_after:
+                try:
+                    delay = min(float(retry_after), self.MAX_RETRY_DELAY)
+                except ValueError:
+                    pass
+            
+            logger.warning(
+                "🔁 Reintentando %s %s (%s), intento %d en %.2fs",
+                method, url, reason, attempt + 2, delay
+            )
+            await asyncio.sleep(delay)
     
-    def _generate_external_reference(self, empresa_id: str, product_id: int = None) -> str:
+    @staticmethod
+    def _generate_external_reference(empresa_id: str, product_id: int = None) -> str:
         """Generar external_reference única para conciliación"""
-        timestamp = int(datetime.now().timestamp())
-        unique_id = uuid.uuid4().hex[:6].upper()
+        timestamp = int(time.time())
+        unique_id = secrets.token_hex(3).upper()
         
         if product_id:
             return f"HS{empresa_id[:2]}{product_id:03d}{timestamp}{unique_id}"
         else:
             return f"HS{empresa_id[:2]}{timestamp}{unique_id}"
     
-    def _build_payer_info(self, payment_data: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def _build_payer_info(payment_data: Dict[str, Any]) -> Dict[str, Any]:
         """Construir información completa del pagador - REQUISITO DE APROBACIÓN"""
         payer = {
             "email": payment_data.get("customer_email", "")  # 🔴 OBLIGATORIO
         }
         
+        customer_name = payment_data.get("customer_name")
+        customer_phone = payment_data.get("customer_phone")
+        if not (customer_name or customer_phone):
+            return payer
+        
         # 🟡 NOMBRE Y APELLIDO - Mejora tasa de aprobación
-        customer_name = payment_data.get("customer_name", "").strip()
+        customer_name = customer_name.strip() if customer_name else ""
         if customer_name:
             name_parts = customer_name.split(" ", 1)
             payer["first_name"] = name_parts[0]
@@ -197,10 +365,10 @@ class MercadoPagoService:
                 payer["last_name"] = name_parts[1]
         
         # 🟡 TELÉFONO - Mejora tasa de aprobación
-        if payment_data.get("customer_phone"):
+        if customer_phone:
             payer["phone"] = {
                 "area_code": "",
-                "number": self._normalize_phone(payment_data["customer_phone"])
+                "number": MercadoPagoService._normalize_phone(customer_phone)
             }
         
         # 🟢 IDENTIFICACIÓN (opcional pero recomendado)
@@ -218,22 +386,22 @@ class MercadoPagoService:
         
         return payer
     
-    def _build_items_info(self, metadata: Optional[Dict[str, Any]] = None, transaction_amount: float = 0) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _build_items_info(metadata: Optional[Dict[str, Any]] = None, transaction_amount: float = 0) -> List[Dict[str, Any]]:
         """Construir información de items - REQUISITO DE APROBACIÓN"""
-        items = []
-        
-        if metadata:
-            items = [{
-                "id": str(metadata.get("producto_id", "1")),  # 🔴 RECOMENDADO
-                "title": metadata.get("product_name", "Acceso Hotspot WiFi"),  # 🔴 RECOMENDADO
-                "description": f"Acceso WiFi - {metadata.get('product_name', 'Servicio')}",  # 🔴 RECOMENDADO
-                "category_id": "services",  # 🔴 RECOMENDADO (services, electronics, etc.)
-                "quantity": 1,  # 🔴 RECOMENDADO
-                "unit_price": float(transaction_amount),  # 🔴 RECOMENDADO
-                # 🟢 CURRENCY_ID no se envía aquí, se infiere automáticamente
-            }]
-        
-        return items
+        if not metadata:
+            return []
+        
+        product_name = metadata.get("product_name")
+        return [{
+            "id": str(metadata.get("producto_id", "1")),  # 🔴 RECOMENDADO
+            "title": product_name or "Acceso Hotspot WiFi",  # 🔴 RECOMENDADO
+            "description": f"Acceso WiFi - {product_name or 'Servicio'}",  # 🔴 RECOMENDADO
+            "category_id": "services",  # 🔴 RECOMENDADO (services, electronics, etc.)
+            "quantity": 1,  # 🔴 RECOMENDADO
+            "unit_price": float(transaction_amount),  # 🔴 RECOMENDADO
+            # 🟢 CURRENCY_ID no se envía aquí, se infiere automáticamente
+        }]
     
 # app/services/mercado_pago_service.py - CORREGIR EL PAYLOAD
 
@@ -246,49 +414,44 @@ class MercadoPagoService:
     ) -> Dict[str, Any]:
         """Crear pago en Mercado Pago - CORREGIDO"""
         
-        print("\n" + "="*60)
-        print("🔍 [MERCADO PAGO] CREANDO PAGO CORREGIDO")
-        print("="*60)
-        
         try:
-            sdk = mercadopago.SDK(access_token)
+            # Metadata opcional: se resuelve una sola vez
+            md = metadata or _EMPTY
             
             # GENERAR EXTERNAL REFERENCE
-            empresa_id = metadata.get("empresa_id", "00") if metadata else "00"
-            producto_id = metadata.get("producto_id") if metadata else None
+            empresa_id = md.get("empresa_id", "00")
+            producto_id = md.get("producto_id")
             external_reference = self._generate_external_reference(empresa_id, producto_id)
             
-            print(f"📌 External Reference generada: {external_reference}")
-            
             # CONSTRUIR PAYLOAD CORREGIDO
-            transaction_amount = float(payment_data["transaction_amount"])
+            # El schema ya lo tipa como float; sólo convertir Decimal/str
+            transaction_amount = payment_data["transaction_amount"]
+            if not isinstance(transaction_amount, (int, float)):
+                transaction_amount = float(transaction_amount)
             
             mp_payload = {
+                **self._payload_base,
+                
                 # 🔴 DATOS BÁSICOS OBLIGATORIOS
                 "transaction_amount": transaction_amount,
                 "token": payment_data["token"],
-                "description": f"Acceso Hotspot - {metadata.get('product_name', 'WiFi')}" if metadata else "Acceso Hotspot WiFi",
+                "description": f"Acceso Hotspot - {md.get('product_name', 'WiFi')}" if md else "Acceso Hotspot WiFi",
                 "payment_method_id": payment_data["payment_method_id"],
                 "installments": payment_data.get("installments", 1),
                 
-                # 🔴 REQUISITOS OBLIGATORIOS
+                # 🔴 REQUISITOS OBLIGATORIOS (notification_url viene de _payload_base)
                 "external_reference": external_reference,
-                "notification_url": urljoin(self.base_url, "/api/v1/webhook/mercado-pago"),
-                
-                # 🟡 MEJORAS
-                "statement_descriptor": "HOTSPOT WIFI",
-                "binary_mode": True,
                 
                 # 🟢 INFORMACIÓN DEL PAGADOR (nivel principal)
                 "payer": self._build_payer_info(payment_data),
                 
                 # 📊 METADATOS (Asegurar que todos sean strings)
-                "metadata": {k: str(v) for k, v in metadata.items()} if metadata else {},
+                "metadata": {k: str(v) for k, v in md.items()},
                 
                 # 🛒 INFORMACIÓN DE ITEMS (SOLO items e ip_address)
                 "additional_info": {
-                    "items": self._build_items_info(metadata, transaction_amount),
-                    "ip_address": metadata.get("ip_cliente", "") if metadata else ""
+                    "items": self._build_items_info(md, transaction_amount),
+                    "ip_address": md.get("ip_cliente", "")
                     # ❌ ELIMINAR: "payer" aquí
                 }
             }
@@ -297,233 +460,209 @@ class MercadoPagoService:
             if payment_data.get("issuer_id") and mode != 'test':
                 mp_payload["issuer_id"] = payment_data["issuer_id"]
             
-            print(f"\n📦 PAYLOAD CORREGIDO:")
-            print(f"   • External Reference: {external_reference}")
-            print(f"   • Notification URL: {mp_payload['notification_url']}")
-            print(f"   • Payer: {mp_payload['payer'].get('email')}")
-            print(f"   • Items: {len(mp_payload['additional_info']['items'])} item(s)")
+            logger.info(
+                "📦 [MERCADO PAGO] Creando pago ref=%s items=%d",
+                external_reference, len(mp_payload["additional_info"]["items"])
+            )
             
-            # Mostrar payload completo para debug
-            print(f"\n🔍 PAYLOAD COMPLETO (sensible):")
-            payload_debug = mp_payload.copy()
-            if "token" in payload_debug:
+            # Mostrar payload completo para debug (token truncado)
+            if logger.isEnabledFor(logging.DEBUG):
+                payload_debug = mp_payload.copy()
                 payload_debug["token"] = f"{payload_debug['token'][:10]}..."
-            print(json.dumps(payload_debug, indent=2))
+                logger.debug("🔍 Payload MP: %s", _dumps_debug(payload_debug))
             
             # CONFIGURAR HEADERS
-            request_options = mercadopago.config.RequestOptions()
-            request_options.custom_headers = {
-                "x-idempotency-key": str(uuid.uuid4())
-            }
+            headers = {**self._auth_headers(access_token), "X-Idempotency-Key": _idempotency_key()}
             
             # 🛡️ AGREGAR DEVICE ID EN HEADERS SI EXISTE
             if payment_data.get("device_id"):
-                request_options.custom_headers["X-Mercado-Pago-Device-Id"] = payment_data["device_id"]
-                print(f"🛡️ Device ID agregado a headers: {payment_data['device_id'][:15]}...")
+                headers["X-Mercado-Pago-Device-Id"] = payment_data["device_id"]
             
             # CREAR PAGO
-            print(f"\n📤 Enviando a Mercado Pago API...")
-            payment_response = sdk.payment().create(mp_payload, request_options)
-            
-            print(f"📥 Respuesta recibida")
+            resp = await self._request("POST", self.PAYMENTS_URL, json=mp_payload, headers=headers)
             
             # MANEJAR RESPUESTA
-            if "response" not in payment_response:
+            try:
+                payment = resp.json()
+            except ValueError:
+                payment = None
+            
+            if not isinstance(payment, dict):
                 error_msg = "Respuesta inválida de Mercado Pago"
-                if isinstance(payment_response, dict):
-                    if "message" in payment_response:
-                        error_msg = payment_response["message"]
-                    elif "error" in payment_response:
-                        error_msg = payment_response["error"]
-                
-                print(f"❌ {error_msg}")
+                logger.warning("❌ %s (HTTP %s)", error_msg, resp.status_code)
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Error de Mercado Pago: {error_msg}"
                 )
             
-            payment = payment_response["response"]
-            
-            # Verificar si es un error 400
-            if isinstance(payment, dict) and payment.get("status") == 400:
+            # Verificar si es un error de la API
+            if resp.status_code >= 400:
                 # 🔍 CAPTURAR DETALLES DEL ERROR (JSON completo)
-                error_body = {}
-                try:
-                    error_body = payment_response.get("response", {})
-                    print(f"📥 Respuesta de error completa: {json.dumps(error_body, indent=2)}")
-                except:
-                    pass
-
-                error_msg = error_body.get("message", "Error de validación")
-                print(f"❌ Error 400: {error_msg}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("📥 Respuesta de error completa: %s", _dumps_debug(payment))
                 
-                if "cause" in payment:
-                    print(f"   • Causas:")
-                    for cause in payment["cause"]:
-                        print(f"     - {cause.get('description')}")
+                error_msg = payment.get("message") or payment.get("error") or "Error de validación"
+                logger.warning(
+                    "❌ Error %s de Mercado Pago: %s | causas: %s",
+                    resp.status_code, error_msg,
+                    [cause.get("description") for cause in payment.get("cause") or ()]
+                )
                 
+                if resp.status_code == 400:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Error de validación: {error_msg}"
+                    )
                 raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Error de validación: {error_msg}"
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail=f"Error de Mercado Pago: {error_msg}"
                 )
             
             # Agregar external_reference a la respuesta
             payment["external_reference"] = external_reference
             
-            print(f"\n✅ PAGO PROCESADO CORRECTAMENTE:")
-            print(f"   • Payment ID: {payment.get('id')}")
-            print(f"   • Status: {payment.get('status')}")
-            
             # MANEJAR ESTADO DEL PAGO
-            status_raw = payment.get("status", "")
-            status_value = str(status_raw).lower() if status_raw else ""
-            
-            if status_value == "approved":
-                print(f"🎉🎉🎉 PAGO APROBADO 🎉🎉🎉")
-                response = self._build_success_response(payment)
-                response["external_reference"] = external_reference
-                response["notification_url_configured"] = True
-                return response
-            
-            elif status_value == "pending":
-                print(f"⏳⏳⏳ PAGO PENDIENTE ⏳⏳⏳")
-                response = self._build_pending_response(payment)
-                response["external_reference"] = external_reference
-                response["notification_url_configured"] = True
-                response["warning"] = "Pago pendiente de confirmación"
-                return response
+            status_value = str(payment.get("status") or "").lower()
+            logger.info("✅ Pago MP %s procesado: %s", payment.get("id"), status_value)
             
-            elif status_value in ["rejected", "cancelled"]:
-                print(f"❌❌❌ PAGO RECHAZADO: {status_value}")
-                error_info = self._parse_mp_error(payment.get("status_detail", ""))
-                print(f"   • Razón: {error_info['user_message']}")
-                
-                raise HTTPException(
-                    status_code=status.HTTP_402_PAYMENT_REQUIRED,
-                    detail=error_info["user_message"]
-                )
-            
-            else:
-                print(f"⚠️  Estado no manejado: {status_value}")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Estado de pago no manejado: {status_value}"
-                )
+            handler = _STATUS_HANDLERS.get(status_value, MercadoPagoService._handle_unknown)
+            return handler(payment, status_value)
                 
         except HTTPException:
             raise
+        except httpx.TimeoutException:
+            logger.warning("⏰ Tiempo de espera agotado al conectar con Mercado Pago")
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Tiempo de espera agotado. Intente nuevamente."
+            )
         except Exception as e:
-            print(f"\n💥 ERROR INESPERADO: {str(e)}")
+            logger.error("💥 Error inesperado creando pago MP: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Error interno al procesar el pago"
             )
         
 
-    def _parse_mp_error(self, status_detail: str) -> Dict[str, str]:
-        """Parsear código de error de Mercado Pago"""
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _parse_mp_error(status_detail: str) -> MPError:
+        """
+        Parsear código de error de Mercado Pago.
         
-        print(f"🔍 Parseando error de Mercado Pago: '{status_detail}'")
+        El resultado sólo depende de status_detail, así que se cachea; es una
+        tupla inmutable porque la misma instancia se comparte entre llamadas.
+        """
+        mp_errors = _MP_ERRORS
         
         if not status_detail:
-            print(f"   ⚠️  Status detail vacío, usando error por defecto")
-            default = self.MP_ERRORS["default"]
-            return {
-                "code": "unknown",
-                "message": default["message"],
-                "user_message": default["user_message"],
-                "categoria": default.get("categoria", "general"),
-                "severidad": default.get("severidad", "alta")
-            }
-        
-        status_detail_lower = status_detail.lower()
+            return _MP_UNKNOWN_ERROR
         
         # Buscar coincidencia exacta
-        if status_detail in self.MP_ERRORS:
-            error_info = self.MP_ERRORS[status_detail]
-            print(f"   ✅ Error encontrado en diccionario: {status_detail}")
-            return {
-                "code": status_detail,
-                "message": error_info["message"],
-                "user_message": error_info["user_message"],
-                "categoria": error_info.get("categoria", "general"),
-                "severidad": error_info.get("severidad", "alta")
-            }
+        error_info = mp_errors.get(status_detail)
+        if error_info is not None:
+            return error_info
         
-        # Buscar coincidencia parcial
-        for error_code, error_info in self.MP_ERRORS.items():
-            if error_code in status_detail_lower or status_detail_lower in error_code:
-                print(f"   🔍 Coincidencia parcial: {error_code}")
-                return {
-                    "code": error_code,
-                    "message": error_info["message"],
-                    "user_message": error_info["user_message"],
-                    "categoria": error_info.get("categoria", "general"),
-                    "severidad": error_info.get("severidad", "alta")
-                }
+        # Coincidencia exacta ignorando mayúsculas (caso común tras la exacta)
+        status_detail_lower = status_detail.lower()
+        error_info = mp_errors.get(status_detail_lower)
+        if error_info is not None:
+            return error_info
+        
+        # Buscar el código conocido más largo que sea prefijo (MP antepone el código)
+        match = _MP_ERROR_PATTERN.match(status_detail_lower)
+        if match:
+            return mp_errors[match.group(0)]
         
         # Error por defecto
-        print(f"   ⚠️  Error no encontrado en diccionario, usando default")
-        default = self.MP_ERRORS["default"]
-        return {
-            "code": status_detail,
-            "message": default["message"],
-            "user_message": default["user_message"],
-            "categoria": default.get("categoria", "general"),
-            "severidad": default.get("severidad", "alta")
-        }
+        return mp_errors["default"]._replace(code=status_detail)
     
-    def _build_success_response(self, payment: Dict) -> Dict[str, Any]:
-        """Construir respuesta para pago exitoso"""
-        return {
-            "payment_id": payment["id"],
-            "status": payment["status"],
-            "status_detail": payment.get("status_detail", ""),
-            "amount": payment.get("transaction_amount", 0),
-            "currency_id": payment.get("currency_id", "MXN"),  # MP devuelve currency_id
-            "date_approved": payment.get("date_approved"),
-            "payer": payment.get("payer", {}),
-            "payment_method": {
-                "id": payment.get("payment_method_id"),
-                "type": payment.get("payment_type_id"),
-                "issuer": payment.get("issuer_id"),
-                "last_four_digits": payment.get("card", {}).get("last_four_digits"),
-                "installments": payment.get("installments")
-            },
-            "additional_info": payment.get("additional_info", {}),
-            "external_reference": payment.get("external_reference", ""),
-            "notification_url_configured": True,
-            "statement_descriptor": payment.get("statement_descriptor", "HOTSPOT WIFI"),
-            "binary_mode": True,
-            "raw_response": payment
+    @staticmethod
+    def _build_response(payment: Dict, *, include_card: bool) -> Dict[str, Any]:
+        """
+        Construir respuesta de pago.
+        
+        include_card=True es la respuesta de pago aprobado (tarjeta, fecha de
+        aprobación, additional_info); False la de pago pendiente.
+        """
+        get = payment.get
+        payment_method = {
+            "id": get("payment_method_id"),
+            "type": get("payment_type_id")
         }
-    
-    def _build_pending_response(self, payment: Dict) -> Dict[str, Any]:
-        """Construir respuesta para pago pendiente"""
-        return {
+        response = {
             "payment_id": payment["id"],
             "status": payment["status"],
-            "status_detail": payment.get("status_detail", ""),
-            "amount": payment.get("transaction_amount", 0),
-            "currency": payment.get("currency_id", "MXN"),
-            "date_created": payment.get("date_created"),
-            "payer": payment.get("payer", {}),
-            "payment_method": {
-                "id": payment.get("payment_method_id"),
-                "type": payment.get("payment_type_id")
-            },
-            "external_reference": payment.get("external_reference", ""),
+            "status_detail": get("status_detail", ""),
+            "amount": get("transaction_amount", 0),
+            "payer": get("payer") or {},
+            "payment_method": payment_method,
+            "external_reference": get("external_reference", ""),
             "notification_url_configured": True,
-            "statement_descriptor": payment.get("statement_descriptor", "HOTSPOT WIFI"),
+            "statement_descriptor": get("statement_descriptor", "HOTSPOT WIFI"),
             "binary_mode": True
         }
+        
+        if include_card:
+            card = get("card") or _EMPTY
+            payment_method["issuer"] = get("issuer_id")
+            payment_method["last_four_digits"] = card.get("last_four_digits")
+            payment_method["installments"] = get("installments")
+            response["currency_id"] = get("currency_id", "MXN")  # MP devuelve currency_id
+            response["date_approved"] = get("date_approved")
+            response["additional_info"] = get("additional_info") or {}
+            if settings.DEBUG_RAW_MP_RESPONSE:
+                response["raw_response"] = payment
+        else:
+            response["currency"] = get("currency_id", "MXN")
+            response["date_created"] = get("date_created")
+        
+        return response
+    
+    # ======================
+    # MANEJADORES POR ESTADO (ver _STATUS_HANDLERS)
+    # ======================
+    @staticmethod
+    def _handle_approved(payment: Dict, status_value: str) -> Dict[str, Any]:
+        return MercadoPagoService._build_response(payment, include_card=True)
     
-    def _normalize_phone(self, phone: str) -> str:
+    @staticmethod
+    def _handle_pending(payment: Dict, status_value: str) -> Dict[str, Any]:
+        response = MercadoPagoService._build_response(payment, include_card=False)
+        response["warning"] = "Pago pendiente de confirmación"
+        return response
+    
+    @staticmethod
+    def _handle_rejected(payment: Dict, status_value: str) -> Dict[str, Any]:
+        error_info = MercadoPagoService._parse_mp_error(payment.get("status_detail", ""))
+        logger.info("❌ Pago MP rechazado (%s): %s", status_value, error_info.code)
+        
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail=error_info.user_message
+        )
+    
+    @staticmethod
+    def _handle_unknown(payment: Dict, status_value: str) -> Dict[str, Any]:
+        logger.warning("⚠️  Estado no manejado: %s", status_value)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Estado de pago no manejado: {status_value}"
+        )
+    
+    @staticmethod
+    def _normalize_phone(phone: str) -> str:
         """Normalizar número de teléfono para Mercado Pago"""
         if not phone:
             return ""
-            
-        digits = ''.join(filter(str.isdigit, phone))
+        
+        # Camino rápido: el frontend suele mandar ya sólo dígitos
+        if phone.isascii() and phone.isdigit():
+            if len(phone) == 10:
+                return phone
+            digits = phone
+        else:
+            digits = _NON_DIGIT_RE.sub("", phone)
         
         if len(digits) == 12 and digits.startswith('52'):
             return digits[2:]  # Quitar +52
@@ -536,87 +675,166 @@ class MercadoPagoService:
     async def get_payment_status(self, access_token: str, payment_id: int) -> Dict[str, Any]:
         """Obtener estado de un pago existente"""
         
-        print(f"\n🔍 CONSULTANDO ESTADO DE PAGO: {payment_id}")
-        print(f"   • Access Token: {access_token[:20]}...")
+        # Reintentos de webhook / polling: los estados finales no cambian y los
+        # demás se reutilizan unos segundos. La llave incluye el token para no
+        # mezclar pagos entre empresas.
+        cache_key = (access_token, payment_id)
+        cached = self._status_cache.get(cache_key) or self._recent_status_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("♻️ Estado de pago MP %s desde caché", payment_id)
+            return dict(cached)
+        
+        logger.debug("🔍 Consultando estado de pago MP: %s", payment_id)
         
         try:
-            sdk = mercadopago.SDK(access_token)
-            response = sdk.payment().get(payment_id)
+            resp = await self._request(
+                "GET",
+                f"{self.PAYMENTS_URL}/{payment_id}",
+                headers=self._auth_headers(access_token)
+            )
             
-            print(f"📥 RESPONSE TYPE: {type(response)}")
-            print(f"📥 RESPONSE KEYS: {response.keys() if isinstance(response, dict) else 'NOT DICT'}")
-            print(f"📥 RESPONSE COMPLETA: {json.dumps(response, indent=2)}")
+            try:
+                payment = resp.json()
+            except ValueError:
+                payment = None
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "📥 Respuesta MP (HTTP %s): %s",
+                    resp.status_code, _dumps_debug(payment)
+                )
             
             # Verificar si es un error
-            if isinstance(response, dict) and response.get("status") == 400:
-                error_msg = response.get("message", "Error desconocido")
-                print(f"❌ Error 400 de Mercado Pago: {error_msg}")
+            if resp.status_code == 404 or not isinstance(payment, dict):
+                logger.warning("❌ Pago %s no encontrado en Mercado Pago", payment_id)
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Pago no encontrado en Mercado Pago"
+                )
+            
+            if resp.status_code >= 400:
+                error_msg = payment.get("message", "Error desconocido")
+                logger.warning("❌ Error %s de Mercado Pago: %s", resp.status_code, error_msg)
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Error de Mercado Pago: {error_msg}"
                 )
             
-            if "response" not in response:
-                print(f"❌ Respuesta inválida para pago {payment_id}")
-                print(f"   Respuesta: {response}")
-                
-                # Puede que la respuesta venga directamente en response
-                if isinstance(response, dict) and "id" in response:
-                    print(f"✅ Encontrado 'id' directamente en respuesta")
-                    payment = response
-                else:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail="Pago no encontrado en Mercado Pago"
-                    )
-            else:
-                payment = response["response"]
-            
-            print(f"📊 PAGO ENCONTRADO:")
-            print(f"   • ID: {payment.get('id')}")
-            print(f"   • Status: {payment.get('status')}")
-            print(f"   • Todas las claves: {list(payment.keys())}")
-            
             # Construir respuesta segura
+            get = payment.get
             result = {
-                "payment_id": payment.get("id", payment_id),
-                "status": payment.get("status", "unknown"),
-                "status_detail": payment.get("status_detail", ""),
-                "amount": payment.get("transaction_amount", 0),
-                "date_approved": payment.get("date_approved"),
-                "date_last_updated": payment.get("date_last_updated"),
-                "external_reference": payment.get("external_reference", ""),
-                "raw_response": payment
+                "payment_id": get("id", payment_id),
+                "status": get("status", "unknown"),
+                "status_detail": get("status_detail", ""),
+                "amount": get("transaction_amount", 0),
+                "date_approved": get("date_approved"),
+                "date_last_updated": get("date_last_updated"),
+                "external_reference": get("external_reference", ""),
+                # Manejar currency_id (algunas respuestas traen "currency")
+                "currency_id": get("currency_id", get("currency", "MXN"))
             }
+            if settings.DEBUG_RAW_MP_RESPONSE:
+                result["raw_response"] = payment
             
-            # Manejar currency_id
-            if "currency_id" in payment:
-                result["currency_id"] = payment["currency_id"]
-            elif "currency" in payment:
-                result["currency_id"] = payment["currency"]
+            if result["status"] in self.TERMINAL_STATUSES:
+                self._status_cache[cache_key] = result
             else:
-                result["currency_id"] = "MXN"
-            
-            return result
+                self._recent_status_cache[cache_key] = result
+            return dict(result)
             
         except HTTPException:
             raise
         except Exception as e:
-            print(f"❌ Error consultando estado del pago {payment_id}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Error consultando estado del pago %s", payment_id)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error al consultar estado del pago: {str(e)}"
             )
 
 
-    async def verify_webhook_signature(self, request_data: Dict, signature: str) -> bool:
-        """Verificar firma del webhook (para producción)"""
-        # Implementación básica - en producción usarías la clave pública de MP
-        return True
+    async def get_payment_statuses(
+        self,
+        access_token: str,
+        payment_ids: List[int]
+    ) -> List[Any]:
+        """
+        Consultar varios pagos en paralelo (conciliación, dashboards).
+        
+        Devuelve los resultados en el mismo orden que payment_ids; un pago que
+        falla aparece como su excepción (HTTPException) en lugar de abortar el lote.
+        """
+        sem = asyncio.Semaphore(self.BATCH_CONCURRENCY)
+        
+        async def one(payment_id: int) -> Dict[str, Any]:
+            async with sem:
+                return await self.get_payment_status(access_token, payment_id)
+        
+        return await asyncio.gather(
+            *(one(payment_id) for payment_id in payment_ids),
+            return_exceptions=True
+        )
+
+    def invalidate_payment_status(self, access_token: str, payment_id: int) -> None:
+        """Descartar el estado cacheado de un pago (p. ej. al recibir su webhook)"""
+        cache_key = (access_token, payment_id)
+        self._status_cache.pop(cache_key, None)
+        self._recent_status_cache.pop(cache_key, None)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _webhook_key(secret_key: str) -> bytes:
+        """Clave HMAC en bytes por empresa (se codifica una sola vez)"""
+        return secret_key.encode("utf-8")
+
+    @staticmethod
+    def verify_webhook_signature(
+        signature_header: Optional[str],
+        request_id: Optional[str],
+        data_id: Optional[str],
+        secret_key: str
+    ) -> bool:
+        """
+        Verificar la firma X-Signature de un webhook de Mercado Pago.
+        
+        Header: "ts=<timestamp>,v1=<hmac>"; manifest firmado con HMAC-SHA256:
+        id:{data_id};request-id:{request_id};ts:{timestamp};
+        La comparación es en tiempo constante (hmac.compare_digest).
+        """
+        if not signature_header or not request_id or not data_id or not secret_key:
+            logger.warning("Faltan datos requeridos para verificar la firma del webhook")
+            return False
+        
+        timestamp = received_hash = None
+        for part in signature_header.split(","):
+            key, _, value = part.strip().partition("=")
+            if key == "ts":
+                timestamp = value
+            elif key == "v1":
+                received_hash = value
+        
+        if not timestamp or not received_hash:
+            logger.warning("Formato X-Signature inválido o incompleto")
+            return False
+        
+        manifest = f"id:{data_id};request-id:{request_id};ts:{timestamp};"
+        expected_hash = hmac.new(
+            MercadoPagoService._webhook_key(secret_key),
+            manifest.encode("utf-8"),
+            hashlib.sha256
+        ).hexdigest()
+        
+        return hmac.compare_digest(expected_hash, received_hash)
+
+
 
 
+# Estado del pago -> manejador (cualquier otro estado cae en _handle_unknown)
+_STATUS_HANDLERS = {
+    "approved": MercadoPagoService._handle_approved,
+    "pending": MercadoPagoService._handle_pending,
+    "rejected": MercadoPagoService._handle_rejected,
+    "cancelled": MercadoPagoService._handle_rejected,
+}
 
 
 ###########
@@ -1,20 +1,175 @@
 # app/services/mikrotik_service.py - VERSIÓN CORREGIDA CON SOPORTE PARA PIN
 import asyncio
-import random
+import re
+import secrets
 import string
 import time
-from typing import List, Dict, Any
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Any, FrozenSet, Iterable, Optional, Set, Tuple
+from datetime import datetime, timezone
 from fastapi import HTTPException, status
 import logging
 
-from app.core.mikrotik_api import MikrotikAPI, MikrotikConnectionError
+from app.core.mikrotik_api import MikrotikConnectionError, mikrotik_pool
 
 logger = logging.getLogger(__name__)
 
+# Generador criptográfico para credenciales hotspot (random no es apto)
+_SYS_RANDOM = secrets.SystemRandom()
+_USER_ALPHABET = string.ascii_uppercase + string.digits
+_PIN_ALPHABET = string.digits
+
+# Formato de credenciales hotspot (parte tras el prefijo "PT-"); sólo ASCII
+_PIN_RE = re.compile(r"[0-9]{5}")
+_USER_RE = re.compile(r"[A-Za-z0-9]{5}")
+_PW_RE = re.compile(r"[0-9]{4}")
+
+# Nombres de perfiles hotspot por router: (host, puerto) -> (expira_en, nombres).
+# Los perfiles cambian cada minutos/días, no por petición.
+PROFILE_CACHE_TTL = 60.0
+_profile_cache: Dict[Tuple[str, int], Tuple[float, FrozenSet[str]]] = {}
+
+# Pausa entre reintentos de verificación (el /add ya está aplicado al responder)
+VERIFY_BACKOFF = 0.05
+
+
+def _utcnow_iso() -> str:
+    """Marca de tiempo UTC (ISO 8601, segundos) para los resultados de creación"""
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _cached_profile_names(host: str, port: int) -> Optional[FrozenSet[str]]:
+    """Nombres de perfiles cacheados del router, o None si no hay o expiraron"""
+    entry = _profile_cache.get((host, port))
+    if entry is None or entry[0] < time.monotonic():
+        return None
+    return entry[1]
+
+
+def _store_profile_names(host: str, port: int, names: Iterable[str]) -> FrozenSet[str]:
+    profile_names = frozenset(names)
+    _profile_cache[(host, port)] = (time.monotonic() + PROFILE_CACHE_TTL, profile_names)
+    return profile_names
+
+
+# Campos de /ip/hotspot/user que realmente usamos (reduce cada fila de la respuesta)
+_USER_PROPLIST = ".id,name,password,profile,disabled"
+
+
+def _find_hotspot_users(api, name: str) -> List[Dict[str, Any]]:
+    """
+    Usuarios hotspot con ese nombre, filtrados en RouterOS (?name=).
+    
+    Api.__call__ sólo compone palabras "=clave=valor", por eso la consulta
+    se envía con rawCmd.
+    """
+    return list(api.connection.rawCmd(
+        "/ip/hotspot/user/print",
+        f"=.proplist={_USER_PROPLIST}",
+        f"?name={name}"
+    ))
+
+
+def _ensure_session(api) -> bool:
+    """
+    Ping de keep-alive sobre la sesión; si cayó, reconectar una sola vez.
+    
+    MikrotikAPI no reconecta de forma implícita, así que una sesión rota
+    haría fallar cada consulta siguiente. Devuelve False si no hay sesión.
+    """
+    if api.is_opened():
+        return True
+    
+    logger.warning("🔌 Sesión RouterOS caída con %s:%s, reconectando una vez...", api.ip, api.port)
+    try:
+        api.reconnect(max_attempts=1)
+        return True
+    except MikrotikConnectionError as e:
+        logger.warning("⚠️ Reconexión fallida: %s", e)
+        return False
+
+
 class MikroTikService:
     """Servicio seguro para conexión con routers MikroTik"""
     
+    # Hilos dedicados a RouterOS (no compiten con el executor por defecto)
+    MAX_WORKERS = 8
+    # Tope por operación: una sesión RouterOS colgada no retiene la petición
+    RPC_TIMEOUT = 20
+    # Operaciones simultáneas por router (RouterOS limita las sesiones API)
+    MAX_CONCURRENT_PER_ROUTER = 3
+    
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.MAX_WORKERS, thread_name_prefix="mikrotik"
+        )
+        self._router_sems: Dict[Tuple[str, int], asyncio.Semaphore] = {}
+        # Limpiezas en segundo plano (referencia fuerte hasta que terminen)
+        self._background: Set[asyncio.Task] = set()
+    
+    def close(self):
+        """Liberar los hilos del executor (al apagar la aplicación)"""
+        self._executor.shutdown(wait=False)
+    
+    async def _run_sync(
+        self,
+        func,
+        host: str,
+        port: int,
+        *args,
+        on_abandoned: Optional[Callable[[asyncio.Future], None]] = None
+    ):
+        """
+        Ejecutar una llamada bloqueante a RouterOS en el executor, con timeout (504).
+        
+        Las llamadas al mismo router se encolan aquí (semáforo por host/puerto)
+        en lugar de ocupar hilos y abrir sesiones que el router rechazaría.
+        Tras un 504 el hueco sigue ocupado hasta que el hilo termine, y
+        on_abandoned (si se da) recibe ese resultado tardío que ya nadie espera.
+        """
+        sem = self._router_sems.get((host, port))
+        if sem is None:
+            sem = self._router_sems[(host, port)] = asyncio.Semaphore(self.MAX_CONCURRENT_PER_ROUTER)
+        
+        # Un solo plazo para la espera del hueco y la llamada: con el router
+        # colgado, los que esperan en cola también reciben su 504 a tiempo
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.RPC_TIMEOUT
+        try:
+            await asyncio.wait_for(sem.acquire(), timeout=self.RPC_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise self._timeout_error()
+        
+        try:
+            fut = loop.run_in_executor(self._executor, func, host, port, *args)
+        except BaseException:
+            sem.release()
+            raise
+        
+        def _release(f: asyncio.Future):
+            # Los hilos no se cancelan: el hueco del router se libera cuando
+            # la llamada termina de verdad, no cuando la petición da 504
+            sem.release()
+            if not f.cancelled():
+                f.exception()  # evitar "exception was never retrieved" tras un timeout
+        
+        fut.add_done_callback(_release)
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(fut), timeout=max(0.0, deadline - loop.time())
+            )
+        except asyncio.TimeoutError:
+            if on_abandoned is not None:
+                fut.add_done_callback(on_abandoned)
+            raise self._timeout_error()
+    
+    @staticmethod
+    def _timeout_error() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Tiempo de espera agotado con el router MikroTik"
+        )
+    
     @staticmethod
     def generate_credentials(user_type: str = "usuario_contrasena") -> Dict[str, str]:
         """
@@ -22,8 +177,8 @@ class MikroTikService:
         
         Args:
             user_type: Tipo de credenciales a generar:
-                - "usuario_contrasena": Usuario alfanumérico (6 chars) + Contraseña (4 dígitos)
-                - "pin": Solo PIN numérico (6 dígitos, sin contraseña)
+                - "usuario_contrasena": Usuario alfanumérico (5 chars) + Contraseña (4 dígitos)
+                - "pin": Solo PIN numérico (5 dígitos, sin contraseña)
         
         Returns:
             Dict con username y password (password vacío para PIN)
@@ -33,36 +188,27 @@ class MikroTikService:
         # Normalizar user_type
         if user_type not in ["usuario_contrasena", "pin"]:
             user_type = "usuario_contrasena"
-            print("⚠️  Tipo de usuario inválido, usando 'usuario_contrasena' por defecto")
+            logger.warning("⚠️ Tipo de usuario inválido, usando 'usuario_contrasena' por defecto")
         
         if user_type == "pin":
-            # Generar PIN numérico de 6 dígitos
-            pin = ''.join(random.choices('0123456789', k=5))
-            username = f"{PREFIX}{pin}"
-            
-            print(f"🔑 PIN generado: {username} (sin contraseña)")
+            # PIN numérico de 5 dígitos
+            username = f"{PREFIX}{''.join(_SYS_RANDOM.choices(_PIN_ALPHABET, k=5))}"
+            logger.debug("🔑 PIN generado: %s (sin contraseña)", username)
             
             return {
                 "username": username,
                 "password": ""  # Sin contraseña para PIN
             }
-        else:
-            # Usuario alfanumérico
-            caracteres = string.ascii_uppercase + string.digits
-            usuario = ''.join(random.choice(caracteres) for _ in range(5))
-            username = f"{PREFIX}{usuario}"
-            
-            # Contraseña numérica
-            contraseña = f"{random.randint(0, 9999):04d}"
-            
-            print("🔑 Credenciales generadas:")
-            print(f"   Usuario: {username}")
-            print(f"   Contraseña: {contraseña}")
-            
-            return {
-                "username": username,
-                "password": contraseña
-            }
+        
+        # Usuario alfanumérico + contraseña numérica
+        username = f"{PREFIX}{''.join(_SYS_RANDOM.choices(_USER_ALPHABET, k=5))}"
+        contraseña = f"{_SYS_RANDOM.randrange(10000):04d}"
+        logger.debug("🔑 Credenciales generadas para %s", username)
+        
+        return {
+            "username": username,
+            "password": contraseña
+        }
     
     async def get_hotspot_profiles(
         self,
@@ -72,27 +218,27 @@ class MikroTikService:
         router_password: str
     ) -> List[Dict[str, Any]]:
         """Obtener perfiles usando MikrotikAPI"""
-        print(f"🔌 Usando MikrotikAPI para {router_host}:{router_port}")
+        logger.debug("🔌 Obteniendo perfiles de %s:%s", router_host, router_port)
         
         try:
-            loop = asyncio.get_event_loop()
-            profiles = await loop.run_in_executor(
-                None,
+            profiles = await self._run_sync(
                 self._get_profiles_sync,
                 router_host, router_port, router_user, router_password
             )
             
-            print(f"✅ Obtenidos {len(profiles)} perfiles")
+            logger.debug("✅ Obtenidos %d perfiles", len(profiles))
             return profiles
             
+        except HTTPException:
+            raise
         except MikrotikConnectionError as e:
-            print(f"❌ Error de conexión: {str(e)}")
+            logger.warning("❌ Error de conexión: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"No se pudo conectar al router: {str(e)}"
             )
         except Exception as e:
-            print(f"❌ Error general: {type(e).__name__}: {str(e)}")
+            logger.error("❌ Error general obteniendo perfiles: %s: %s", type(e).__name__, e, exc_info=True)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error al obtener perfiles: {str(e)}"
@@ -107,7 +253,7 @@ class MikroTikService:
     ) -> List[Dict[str, Any]]:
         """Versión síncrona para obtener perfiles"""
         try:
-            with MikrotikAPI(host, port, user, password, timeout=15) as api:
+            with mikrotik_pool.acquire(host, port, user, password, timeout=15) as api:
                 profiles = api.get_hotspot_profiles()
                 
                 transformed = []
@@ -125,6 +271,7 @@ class MikroTikService:
                         "mac_cookie_timeout": p.get("mac-cookie-timeout")
                     })
                 
+                _store_profile_names(host, port, (p["name"] for p in transformed))
                 return transformed
         except Exception as e:
             raise Exception(f"Error obteniendo perfiles: {str(e)}")
@@ -145,8 +292,6 @@ class MikroTikService:
         """
         Crear usuario en Hotspot MikroTik - VERSIÓN CON SOPORTE PARA PIN
         """
-        print(f"👤 Intentando crear usuario: {username} (perfil: {profile_name}, tipo: {user_type})")
-
         PREFIX = "PT-"
 
         # Validaciones base
@@ -156,11 +301,9 @@ class MikroTikService:
                 detail=f"El usuario debe iniciar con el prefijo {PREFIX}"
             )
 
-        core_value = username[len(PREFIX):]  # Parte sin prefijo
-
         if user_type == "pin":
-            # PIN: 5 dígitos numéricos
-            if len(core_value) != 5 or not core_value.isdigit():
+            # PIN: 5 dígitos numéricos (se valida desde el fin del prefijo, sin copiar)
+            if not _PIN_RE.fullmatch(username, len(PREFIX)):
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="El PIN debe contener exactamente 5 dígitos numéricos"
@@ -168,27 +311,28 @@ class MikroTikService:
 
             # Forzar password vacío
             if password:
-                print("⚠️ Password ignorado para tipo PIN")
+                logger.debug("⚠️ Password ignorado para tipo PIN")
                 password = ""
 
         else:
             # Usuario + contraseña: 5 caracteres alfanuméricos
-            if len(core_value) != 5 or not core_value.isalnum():
+            if not _USER_RE.fullmatch(username, len(PREFIX)):
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="El usuario debe contener exactamente 5 caracteres alfanuméricos"
                 )
 
-            if len(password) != 4 or not password.isdigit():
+            if not _PW_RE.fullmatch(password):
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="La contraseña debe contener exactamente 4 dígitos numéricos"
                 )
 
+        # Log sólo para peticiones válidas; las rechazadas salen antes sin coste de formato
+        logger.debug("👤 Creando usuario %s (perfil: %s, tipo: %s)", username, profile_name, user_type)
+
         try:
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None,
+            result = await self._run_sync(
                 self._create_user_sync_optimizado,
                 router_host,
                 router_port,
@@ -198,30 +342,64 @@ class MikroTikService:
                 password,
                 profile_name,
                 skip_verification,
-                user_type
+                user_type,
+                on_abandoned=self._orphan_cleanup(
+                    router_host, router_port, router_user, router_password, username
+                )
             )
 
             if not result.get("success"):
                 error_msg = result.get("error", "Error desconocido")
-                print(f"❌ Falló creación: {error_msg}")
+                logger.warning("❌ Falló creación de %s: %s", username, error_msg)
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     detail=f"No se pudo crear el usuario: {error_msg}"
                 )
 
-            print(f"✅ Usuario {username} creado exitosamente")
+            logger.info("✅ Usuario %s creado exitosamente", username)
             return result
 
         except HTTPException:
             raise
         except Exception as e:
-            print(f"❌ Error inesperado: {e}")
+            logger.error("❌ Error inesperado creando %s: %s", username, e, exc_info=True)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error al crear usuario: {str(e)}"
             )
 
 
+    def _orphan_cleanup(
+        self,
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        username: str
+    ) -> Callable[[asyncio.Future], None]:
+        """
+        Callback para una creación que terminó después del 504.
+        
+        El llamador ya trató la creación como fallida (no hay pago ni registro
+        en BD), así que si el /add llegó a aplicarse el usuario queda huérfano
+        en el router: se elimina en segundo plano.
+        """
+        def _cleanup(fut: asyncio.Future):
+            if fut.cancelled() or fut.exception() is not None or not fut.result().get("success"):
+                return
+            logger.warning("🧹 Usuario %s creado tras el timeout: eliminándolo del router", username)
+            task = asyncio.ensure_future(self._delete_orphan(host, port, user, password, username))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        
+        return _cleanup
+    
+    async def _delete_orphan(self, host: str, port: int, user: str, password: str, username: str):
+        try:
+            await self.delete_hotspot_user(host, port, user, password, username)
+        except Exception as e:
+            logger.error("❌ No se pudo eliminar el usuario huérfano %s: %s", username, e)
+    
     def _create_user_sync_optimizado(
         self,
         host: str,
@@ -237,163 +415,189 @@ class MikroTikService:
         """
         VERSIÓN CON SOPORTE PARA PIN - Sin comentarios, verificación reducida
         """
-        print(f"🔌 Conectando a MikroTik {host}:{port} (tipo usuario: {user_type})...")
+        logger.debug("🔌 Conectando a MikroTik %s:%s (tipo usuario: %s)...", host, port, user_type)
         
-        api = None
         try:
-            # 1. Conectar
-            api = MikrotikAPI(host, port, user, password, timeout=10)
-            api.open()
-            print(f"✅ Conexión establecida")
-            
-            # 2. Verificar perfil
-            print(f"🔍 Verificando perfil: {profile_name}")
-            profiles = api.connection(cmd="/ip/hotspot/user/profile/print")
-            profiles_list = list(profiles)
-            
-            profile_exists = any(p.get('name') == profile_name for p in profiles_list)
-            
-            if not profile_exists:
-                available = [p.get('name') for p in profiles_list[:3]]
-                error_msg = f"Perfil '{profile_name}' no encontrado. Disponibles: {', '.join(available)}"
-                print(f"❌ {error_msg}")
-                return {"success": False, "error": error_msg}
-            
-            print(f"✅ Perfil encontrado")
-            
-            # 3. Verificar duplicados (solo si no es modo rápido)
-            if not skip_verification:
-                print(f"🔍 Verificando duplicados...")
-                all_users = api.connection(cmd="/ip/hotspot/user/print")
-                if any(u.get('name') == hotspot_username for u in all_users):
-                    print(f"⚠️ Usuario {hotspot_username} ya existe")
-                    return {"success": False, "error": "El usuario ya existe en el sistema"}
-            
-            # 4. Crear usuario - SIN COMENTARIOS
-            print(f"🛠️ Creando usuario {hotspot_username} (tipo: {user_type})...")
-            
-            add_params = {
-                "name": hotspot_username,
-                "profile": profile_name,
-                "disabled": "no"
-            }
-            
-            # Solo agregar password si no es tipo PIN y no está vacío
-            if user_type != "pin" and hotspot_password:
-                add_params["password"] = hotspot_password
-            elif user_type == "pin":
-                print(f"🔒 Tipo PIN: No se incluye password en la creación")
-            
-            print(f"📦 Parámetros: {add_params}")
-            
-            # Ejecutar
-            result = api.connection(cmd="/ip/hotspot/user/add", **add_params)
-            list(result)
-            print(f"📤 Comando ejecutado")
-            
-            # 5. Verificación optimizada (2 intentos)
-            if skip_verification:
-                print(f"⚡ Modo rápido: Sin verificación")
-                return {
-                    "success": True,
-                    "user_id": "not_verified",
-                    "username": hotspot_username,
+            # 1. Conectar (sesión reutilizada del pool si hay una libre)
+            with mikrotik_pool.acquire(host, port, user, password, timeout=10) as api:
+                logger.debug("✅ Conexión establecida")
+                
+                # 2. Verificar perfil
+                logger.debug("🔍 Verificando perfil: %s", profile_name)
+                profile_names = _cached_profile_names(host, port)
+                if profile_names is None or profile_name not in profile_names:
+                    # Sin caché, expirada o perfil posiblemente nuevo: consultar al router
+                    profiles = api.connection(cmd="/ip/hotspot/user/profile/print")
+                    profile_names = _store_profile_names(host, port, (p.get('name') for p in profiles))
+            
+                if profile_name not in profile_names:
+                    available = sorted(name for name in profile_names if name)[:3]
+                    error_msg = f"Perfil '{profile_name}' no encontrado. Disponibles: {', '.join(available)}"
+                    logger.warning("❌ %s", error_msg)
+                    return {"success": False, "error": error_msg}
+            
+                logger.debug("✅ Perfil encontrado")
+            
+                # 3. Verificar duplicados (solo si no es modo rápido)
+                if not skip_verification:
+                    logger.debug("🔍 Verificando duplicados...")
+                    if _find_hotspot_users(api, hotspot_username):
+                        logger.warning("⚠️ Usuario %s ya existe", hotspot_username)
+                        return {"success": False, "error": "El usuario ya existe en el sistema"}
+            
+                # 4. Crear usuario - SIN COMENTARIOS
+                logger.debug("🛠️ Creando usuario %s (tipo: %s)...", hotspot_username, user_type)
+            
+                add_params = {
+                    "name": hotspot_username,
                     "profile": profile_name,
-                    "user_type": user_type,
-                    "verified": False,
-                    "message": "Usuario creado (modo rápido)",
-                    "created_at": datetime.now().isoformat()
+                    "disabled": "no"
                 }
             
-            print(f"🔍 Verificación rápida (2 intentos)...")
-            
-            for attempt in range(2):
-                if attempt > 0:
-                    time.sleep(0.8)
+                # Solo agregar password si no es tipo PIN y no está vacío
+                if user_type != "pin" and hotspot_password:
+                    add_params["password"] = hotspot_password
+                elif user_type == "pin":
+                    logger.debug("🔒 Tipo PIN: No se incluye password en la creación")
+            
+                logger.debug("📦 Parámetros: name=%s profile=%s", hotspot_username, profile_name)
+            
+                # Ejecutar: RouterOS responde al /add con el .id del nuevo usuario (=ret=)
+                response = list(api.connection(cmd="/ip/hotspot/user/add", **add_params))
+                new_id = response[0].get("ret") if response else None
+                logger.debug("📤 Comando ejecutado (id=%s)", new_id)
+            
+                # 5. El id devuelto confirma la creación: no hace falta re-consultar
+                if new_id:
+                    return {
+                        "success": True,
+                        "user_id": new_id,
+                        "username": hotspot_username,
+                        "profile": profile_name,
+                        "user_type": user_type,
+                        "verified": True,
+                        "message": "Usuario creado y verificado",
+                        "created_at": _utcnow_iso(),
+                        "mikrotik_data": {
+                            "name": hotspot_username,
+                            "profile": profile_name,
+                            "disabled": False,
+                            "has_password": "password" in add_params
+                        }
+                    }
+            
+                # Sin id en la respuesta: verificación optimizada (2 intentos)
+                if skip_verification:
+                    logger.debug("⚡ Modo rápido: Sin verificación")
+                    return {
+                        "success": True,
+                        "user_id": "not_verified",
+                        "username": hotspot_username,
+                        "profile": profile_name,
+                        "user_type": user_type,
+                        "verified": False,
+                        "message": "Usuario creado (modo rápido)",
+                        "created_at": _utcnow_iso()
+                    }
+            
+                logger.debug("🔍 Verificación rápida (2 intentos)...")
+            
+                for attempt in range(2):
+                    if attempt > 0:
+                        # Los comandos RouterOS son síncronos; sólo una pausa mínima
+                        time.sleep(VERIFY_BACKOFF)
                 
-                try:
-                    all_users = api.connection(cmd="/ip/hotspot/user/print")
-                    
-                    for u in all_users:
-                        if u.get('name') == hotspot_username:
-                            user_id = u.get('.id')
-                            user_password_in_mikrotik = u.get('password', '')
+                    # Detectar la sesión caída antes de consultar (reconecta una vez si hace falta)
+                    if not _ensure_session(api):
+                        break
+                
+                    try:
+                        for u in _find_hotspot_users(api, hotspot_username):
+                            if u.get('name') == hotspot_username:
+                                user_id = u.get('.id')
+                                user_password_in_mikrotik = u.get('password', '')
                             
-                            # Verificar que el password en MikroTik coincida
-                            if user_type != "pin" and user_password_in_mikrotik != hotspot_password:
-                                print(f"⚠️  Password en MikroTik no coincide")
-                            elif user_type == "pin" and user_password_in_mikrotik:
-                                print(f"⚠️  PIN tiene password inesperado en MikroTik")
+                                # Verificar que el password en MikroTik coincida
+                                if user_type != "pin" and user_password_in_mikrotik != hotspot_password:
+                                    logger.warning("⚠️ Password en MikroTik no coincide para %s", hotspot_username)
+                                elif user_type == "pin" and user_password_in_mikrotik:
+                                    logger.warning("⚠️ PIN %s tiene password inesperado en MikroTik", hotspot_username)
                             
-                            print(f"✅ Verificado (intento {attempt + 1})")
+                                logger.debug("✅ Verificado (intento %d)", attempt + 1)
                             
-                            return {
-                                "success": True,
-                                "user_id": user_id,
-                                "username": hotspot_username,
-                                "profile": profile_name,
-                                "user_type": user_type,
-                                "verified": True,
-                                "verification_attempt": attempt + 1,
-                                "message": "Usuario creado y verificado",
-                                "created_at": datetime.now().isoformat(),
-                                "mikrotik_data": {
-                                    "name": u.get('name'),
-                                    "profile": u.get('profile'),
-                                    "disabled": u.get('disabled', 'false'),
-                                    "has_password": bool(user_password_in_mikrotik)
+                                return {
+                                    "success": True,
+                                    "user_id": user_id,
+                                    "username": hotspot_username,
+                                    "profile": profile_name,
+                                    "user_type": user_type,
+                                    "verified": True,
+                                    "verification_attempt": attempt + 1,
+                                    "message": "Usuario creado y verificado",
+                                    "created_at": _utcnow_iso(),
+                                    "mikrotik_data": {
+                                        "name": u.get('name'),
+                                        "profile": u.get('profile'),
+                                        "disabled": u.get('disabled', 'false'),
+                                        "has_password": bool(user_password_in_mikrotik)
+                                    }
                                 }
-                            }
-                except Exception as e:
-                    print(f"⚠️ Error verificación: {str(e)}")
-                    continue
+                    except Exception as e:
+                        logger.warning("⚠️ Error verificación (intento %d): %s", attempt + 1, e)
+                        # Un error a mitad de respuesta deja el stream a medio leer: cerrar la
+                        # sesión para que el pool la descarte en vez de devolverla desincronizada
+                        api.close()
+                        break
             
-            # Modo pragmático
-            print(f"⚠️ MODO PRAGMÁTICO: Asumiendo éxito")
-            return {
-                "success": True,
-                "user_id": "created_pragmatic",
-                "username": hotspot_username,
-                "profile": profile_name,
-                "user_type": user_type,
-                "verified": False,
-                "pragmatic_mode": True,
-                "message": "Usuario creado exitosamente (modo pragmático)",
-                "created_at": datetime.now().isoformat()
-            }
+                # Modo pragmático
+                logger.warning("⚠️ MODO PRAGMÁTICO: asumiendo éxito para %s", hotspot_username)
+                return {
+                    "success": True,
+                    "user_id": "created_pragmatic",
+                    "username": hotspot_username,
+                    "profile": profile_name,
+                    "user_type": user_type,
+                    "verified": False,
+                    "pragmatic_mode": True,
+                    "message": "Usuario creado exitosamente (modo pragmático)",
+                    "created_at": _utcnow_iso()
+                }
                 
         except Exception as e:
-            print(f"💥 Error: {type(e).__name__}: {str(e)}")
+            logger.error("💥 Error en MikroTik %s:%s: %s: %s", host, port, type(e).__name__, e, exc_info=True)
             return {"success": False, "error": f"Error en MikroTik: {str(e)}"}
-        
-        finally:
-            if api:
-                try:
-                    api.close()
-                except:
-                    pass
     
     async def test_connection(
         self,
         router_host: str,
         router_port: int,
         router_user: str,
-        router_password: str
+        router_password: str,
+        include_profiles: bool = False
     ) -> Dict[str, Any]:
-        """Probar conexión usando MikrotikAPI"""
-        print(f"🔍 Test conexión a {router_host}:{router_port}")
+        """
+        Probar conexión usando MikrotikAPI
+        
+        Por defecto sólo consulta la identidad del router; con include_profiles
+        también cuenta los perfiles hotspot y devuelve una muestra.
+        """
+        logger.debug("🔍 Test conexión a %s:%s", router_host, router_port)
         
         try:
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None,
+            result = await self._run_sync(
                 self._test_connection_sync,
-                router_host, router_port, router_user, router_password
+                router_host, router_port, router_user, router_password, include_profiles
             )
             
-            print(f"✅ Test de conexión exitoso")
+            logger.debug("✅ Test de conexión exitoso")
             return result
             
+        except HTTPException as e:
+            return {
+                "success": False,
+                "error": e.detail,
+                "connected": False
+            }
         except MikrotikConnectionError as e:
             return {
                 "success": False,
@@ -416,11 +620,9 @@ class MikroTikService:
         username: str
     ) -> None:
         """Eliminar usuario en MikroTik - VERSIÓN MEJORADA PARA AMBOS TIPOS"""
-        print(f"🗑️ Iniciando eliminación de usuario: {username}")
+        logger.debug("🗑️ Iniciando eliminación de usuario: %s", username)
         
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(
-            None,
+        await self._run_sync(
             self._delete_hotspot_user_sync_mejorada,  # Usar versión mejorada
             router_host,
             router_port,
@@ -438,156 +640,69 @@ class MikroTikService:
         username: str
     ):
         """Eliminar usuario - VERSIÓN MEJORADA que funciona para ambos tipos"""
-        api = None
         try:
-            print(f"🗑️ ELIMINANDO usuario: '{username}' de {host}:{port}")
-            print(f"🔍 Tipo de dato username: {type(username).__name__}, valor: '{username}'")
+            logger.debug("🗑️ Eliminando usuario %r de %s:%s", username, host, port)
             
-            # Conectar a MikroTik
-            api = MikrotikAPI(host, port, user, password, timeout=10)
-            api.open()
-            print(f"✅ Conexión establecida")
-            
-            # 1. Buscar el usuario - SIMPLIFICADO
-            print(f"🔍 Buscando usuario '{username}'...")
-            all_users = api.connection(cmd="/ip/hotspot/user/print")
-            
-            user_id = None
-            mikrotik_username = None
-            search_name = str(username).strip()
-            
-            for u in all_users:
-                current_name = u.get('name', '')
-                # Convertir a string y comparar
-                if str(current_name).strip() == search_name:
-                    user_id = u.get('.id')
-                    mikrotik_username = str(current_name).strip()
-                    print(f"✅ Usuario encontrado: ID={user_id}, Nombre='{mikrotik_username}'")
-                    print(f"📋 Detalles: perfil={u.get('profile')}, password={u.get('password', '(vacío)')}")
-                    break
-            
-            if not user_id:
-                print(f"⚠️ Usuario '{search_name}' no encontrado (quizás ya fue eliminado)")
-                # Mostrar algunos usuarios para debug
-                print(f"📊 Primeros 3 usuarios en MikroTik:")
-                users_list = list(all_users)
-                for i, u in enumerate(users_list[:3]):
-                    name = u.get('name', '')
-                    print(f"   {i+1}. '{str(name).strip()}' (tipo: {type(name).__name__})")
-                return
-            
-            # 2. Intentar eliminación (mismos 3 métodos que antes)
-            print(f"🔄 Ejecutando: /ip/hotspot/user/remove con numbers={user_id}")
-            try:
-                result = api.connection(cmd="/ip/hotspot/user/remove", numbers=user_id)
-                list(result)
-                print(f"✅ Comando remove ejecutado")
-            except Exception as e1:
-                print(f"⚠️ Método 1 falló: {e1}")
+            # Conectar a MikroTik (sesión reutilizada del pool si hay una libre)
+            with mikrotik_pool.acquire(host, port, user, password, timeout=10) as api:
+                logger.debug("✅ Conexión establecida")
                 
-                # Intentar método alternativo
-                try:
-                    print(f"🔄 Intentando con '.id'={user_id}")
-                    result = api.connection(cmd="/ip/hotspot/user/remove", **{".id": user_id})
-                    list(result)
-                    print(f"✅ Comando remove ejecutado (método .id)")
-                except Exception as e2:
-                    print(f"⚠️ Método 2 falló: {e2}")
+                # 1. Buscar el .id con una consulta filtrada (?name=)
+                search_name = str(username).strip()
+                found = next(
+                    (u for u in _find_hotspot_users(api, search_name)
+                     if str(u.get('name', '')).strip() == search_name),
+                    None
+                )
+                user_id = found.get('.id') if found else None
+            
+                if not user_id:
+                    logger.info("⚠️ Usuario %r no encontrado (quizás ya fue eliminado)", search_name)
                     return
             
-            # 3. Verificar eliminación
-            print(f"🔍 Verificando eliminación...")
-            time.sleep(1.0)
+                logger.debug("✅ Usuario encontrado: ID=%s, perfil=%s", user_id, found.get('profile'))
             
-            usuario_eliminado = False
-            for attempt in range(2):
-                if attempt > 0:
-                    time.sleep(0.5)
-                
-                try:
-                    all_users_after = api.connection(cmd="/ip/hotspot/user/print")
-                    user_still_exists = False
-                    
-                    for u in all_users_after:
-                        if str(u.get('name', '')).strip() == search_name:
-                            user_still_exists = True
-                            break
-                    
-                    if not user_still_exists:
-                        usuario_eliminado = True
-                        print(f"✅ VERIFICADO: Usuario '{username}' eliminado")
-                        break
-                        
-                except Exception as e:
-                    print(f"⚠️ Error verificación {attempt + 1}: {e}")
-            
-            if not usuario_eliminado:
-                print(f"⚠️ No se pudo verificar eliminación de '{username}'")
+                # 2. Eliminar: /remove es síncrono y lanza TrapError si falla,
+                #    así que no hace falta volver a consultar para verificar
+                list(api.connection(cmd="/ip/hotspot/user/remove", numbers=user_id))
+                logger.info("✅ Usuario %r eliminado", username)
                     
         except Exception as e:
-            print(f"❌ Error eliminando usuario: {type(e).__name__}: {str(e)}")
-            
-        finally:
-            if api:
-                try:
-                    api.close()
-                    print(f"🔌 Conexión cerrada")
-                except:
-                    pass
-
-    def _force_delete_user(self, api, user_id: str, username: str):
-        """Método alternativo si el remove normal falla"""
-        try:
-            print(f"🔄 Intentando eliminación forzada de {username}...")
-            
-            # Método alternativo 1: Usar .call()
-            # (dependiendo de cómo esté implementada tu MikrotikAPI)
-            if hasattr(api.connection, 'call'):
-                result = api.connection.call(
-                    '/ip/hotspot/user/remove',
-                    numbers=user_id
-                )
-                print(f"✅ Eliminación forzada ejecutada")
-                return
-            
-            # Método alternativo 2: Intentar con formato diferente
-            print(f"🔄 Probando con parámetro '=.id'...")
-            result = api.connection(
-                cmd="/ip/hotspot/user/remove",
-                **{"=.id": user_id}
-            )
-            list(result)
-            print(f"✅ Eliminación con '=.id' ejecutada")
-            
-        except Exception as e:
-            print(f"❌ Eliminación forzada también falló: {str(e)}")
-
+            logger.error("❌ Error eliminando usuario %r: %s: %s", username, type(e).__name__, e, exc_info=True)
 
     def _test_connection_sync(
         self,
         host: str,
         port: int,
         user: str,
-        password: str
+        password: str,
+        include_profiles: bool = False
     ) -> Dict[str, Any]:
-        """Test síncrono de conexión"""
+        """Test síncrono de conexión (sólo identidad, salvo que se pidan los perfiles)"""
         try:
-            with MikrotikAPI(host, port, user, password, timeout=10) as api:
-                identity = api.connection(cmd="/system/identity/print")
-                router_name = list(identity)[0].get("name", "Desconocido")
+            with mikrotik_pool.acquire(host, port, user, password, timeout=10) as api:
+                identity = list(api.connection.rawCmd("/system/identity/print", "=.proplist=name"))
+                router_name = identity[0].get("name", "Desconocido") if identity else "Desconocido"
                 
-                profiles = api.get_hotspot_profiles()
-                
-                return {
+                result = {
                     "success": True,
                     "connected": True,
-                    "router_name": router_name,
-                    "profiles_count": len(profiles),
-                    "profiles_sample": [
+                    "router_name": router_name
+                }
+                
+                if include_profiles:
+                    # Sólo .id y nombre: el resto de columnas no se usa aquí
+                    profiles = list(api.connection.rawCmd(
+                        "/ip/hotspot/user/profile/print", "=.proplist=.id,name"
+                    ))
+                    _store_profile_names(host, port, (p.get("name") for p in profiles))
+                    result["profiles_count"] = len(profiles)
+                    result["profiles_sample"] = [
                         {"id": p.get(".id"), "name": p.get("name")}
                         for p in profiles[:3]
                     ]
-                }
+                
+                return result
                 
         except Exception as e:
             raise MikrotikConnectionError(f"No se pudo conectar: {str(e)}")
@@ -1,29 +1,47 @@
 # app/services/telegram_service.py
 import httpx
 import logging
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
 class TelegramService:
-    @staticmethod
-    async def send_message(token: str, chat_id: str, message: str):
+    def __init__(self):
+        # Cliente compartido: las notificaciones reutilizan la conexión TLS a api.telegram.org
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Obtener (o crear) el cliente HTTP reutilizable"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=10.0,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+            )
+        return self._client
+
+    async def close(self):
+        """Cerrar el cliente HTTP (al apagar la aplicación)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def send_message(self, token: str, chat_id: str, message: str):
         """Enviar mensaje asíncrono a Telegram"""
         if not token or not chat_id:
             logger.warning("Intentando enviar mensaje de Telegram sin token o chat_id")
             return
-        
+
         url = f"https://api.telegram.org/bot{token}/sendMessage"
         payload = {
             "chat_id": chat_id,
             "text": message,
             "parse_mode": "HTML"
         }
-        
+
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload, timeout=10.0)
-                response.raise_for_status()
-                return True
+            response = await self._get_client().post(url, json=payload)
+            response.raise_for_status()
+            return True
         except Exception as e:
             logger.error(f"Error enviando mensaje a Telegram: {str(e)}")
             return False
@@ -16,18 +16,20 @@ async def create_super_admin():
     print("👑 Creando super administrador...")
     
     async with AsyncSessionLocal() as db:
-        # Verificar si ya existe
-        result = await db.execute(
-            select(Usuario).where(Usuario.email == settings.SUPER_ADMIN_INITIAL_EMAIL)
+        # Verificar si ya existe (sólo el id, no la fila completa)
+        existing_id = await db.scalar(
+            select(Usuario.id)
+            .where(Usuario.email == settings.SUPER_ADMIN_INITIAL_EMAIL)
+            .limit(1)
         )
-        existing = result.scalar_one_or_none()
         
-        if not existing:
-            # Hashear contraseña
-            hashed_pw = bcrypt.hashpw(
+        if existing_id is None:
+            # Hashear contraseña en un hilo: bcrypt bloquea ~250 ms
+            hashed_pw = (await asyncio.to_thread(
+                bcrypt.hashpw,
                 settings.SUPER_ADMIN_INITIAL_PASSWORD.encode('utf-8'),
                 bcrypt.gensalt()
-            ).decode('utf-8')
+            )).decode('utf-8')
             
             # Crear super admin
             admin = Usuario(
@@ -46,4 +48,10 @@ async def create_super_admin():
             print("⚠️  Super admin ya existe")
 
 if __name__ == "__main__":
+    # uvloop si está disponible (no existe en Windows)
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(create_super_admin())
\ No newline at end of file
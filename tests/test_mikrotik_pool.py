@@ -0,0 +1,106 @@
+import socket
+
+import pytest
+
+from app.core import mikrotik_api
+from app.core.mikrotik_api import MikrotikPool
+from app.services import mikrotik_service as service_module
+from app.services.mikrotik_service import MikroTikService
+
+
+class FakeConnection:
+    """Conexión librouteros mínima: /add sin '=ret=' y búsquedas ?name= configurables"""
+
+    def __init__(self):
+        self.closed = False
+        self.added = False
+        self.fail_after_add = False
+
+    def __call__(self, cmd, **kwargs):
+        if cmd == "/ip/hotspot/user/profile/print":
+            return iter([{".id": "*1", "name": "default"}])
+        if cmd == "/ip/hotspot/user/add":
+            self.added = True
+            return iter([])
+        return iter([])
+
+    def rawCmd(self, cmd, *words):
+        if cmd == "/system/identity/print":
+            return iter([{"name": "router"}])
+        if self.added and self.fail_after_add:
+            raise socket.timeout("timed out")
+        return iter([])
+
+    def close(self):
+        self.closed = True
+
+
+class FakeMikrotikAPI:
+    instances = []
+
+    def __init__(self, ip, port, username, password, timeout=30):
+        self.ip = ip
+        self.port = port
+        self.connection = None
+        FakeMikrotikAPI.instances.append(self)
+
+    def open(self):
+        self.connection = FakeConnection()
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+    def is_opened(self):
+        return self.connection is not None and not self.connection.closed
+
+    def reconnect(self, max_attempts=3):
+        self.close()
+        self.open()
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    FakeMikrotikAPI.instances = []
+    pool = MikrotikPool()
+    monkeypatch.setattr(mikrotik_api, "MikrotikAPI", FakeMikrotikAPI)
+    monkeypatch.setattr(service_module, "mikrotik_pool", pool)
+    service_module._profile_cache.clear()
+    return pool
+
+
+def _create(service):
+    return service._create_user_sync_optimizado(
+        "10.0.0.1", 8728, "admin", "secret", "PT-AB123", "1234", "default"
+    )
+
+
+def test_session_is_reused_after_clean_block(pool):
+    with pool.acquire("10.0.0.1", 8728, "admin", "secret") as api:
+        first = api
+
+    with pool.acquire("10.0.0.1", 8728, "admin", "secret") as api:
+        assert api is first
+
+    assert len(FakeMikrotikAPI.instances) == 1
+
+
+def test_session_with_swallowed_io_error_is_not_reused(pool):
+    service = MikroTikService()
+    try:
+        with pool.acquire("10.0.0.1", 8728, "admin", "secret") as api:
+            api.connection.fail_after_add = True
+            first = api
+
+        # El error de la verificación se captura dentro del bloque del pool
+        result = _create(service)
+        assert result["success"] is True
+        assert result["verified"] is False
+        assert first.connection is None
+
+        with pool.acquire("10.0.0.1", 8728, "admin", "secret") as api:
+            assert api is not first
+        assert len(FakeMikrotikAPI.instances) == 2
+    finally:
+        service.close()
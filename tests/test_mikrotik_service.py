@@ -0,0 +1,106 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.mikrotik_service import MikroTikService
+
+
+def test_timed_out_call_keeps_router_slot_until_thread_finishes():
+    service = MikroTikService()
+    service.RPC_TIMEOUT = 0.05
+    release = threading.Event()
+
+    def slow_rpc(host, port):
+        release.wait(5)
+        return "done"
+
+    async def scenario():
+        with pytest.raises(HTTPException) as exc:
+            await service._run_sync(slow_rpc, "10.0.0.1", 8728)
+        assert exc.value.status_code == 504
+
+        # El hilo sigue ocupando su hueco del router tras el 504
+        sem = service._router_sems[("10.0.0.1", 8728)]
+        assert sem._value == service.MAX_CONCURRENT_PER_ROUTER - 1
+
+        release.set()
+        for _ in range(100):
+            if sem._value == service.MAX_CONCURRENT_PER_ROUTER:
+                break
+            await asyncio.sleep(0.01)
+        assert sem._value == service.MAX_CONCURRENT_PER_ROUTER
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        service.close()
+
+
+def test_create_that_completes_after_timeout_removes_orphan_user():
+    service = MikroTikService()
+    service.RPC_TIMEOUT = 0.05
+    release = threading.Event()
+    deleted = []
+
+    def slow_create(host, port, user, password, username, *args):
+        release.wait(5)
+        return {"success": True, "user_id": "*A", "username": username}
+
+    def record_delete(host, port, user, password, username):
+        deleted.append(username)
+
+    service._create_user_sync_optimizado = slow_create
+    service._delete_hotspot_user_sync_mejorada = record_delete
+
+    async def scenario():
+        with pytest.raises(HTTPException) as exc:
+            await service.create_hotspot_user(
+                "10.0.0.1", 8728, "admin", "secret", "PT-AB123", "1234", "default"
+            )
+        assert exc.value.status_code == 504
+        assert deleted == []
+
+        # El /add termina después del 504: el usuario huérfano se elimina
+        release.set()
+        for _ in range(100):
+            if deleted:
+                break
+            await asyncio.sleep(0.01)
+        assert deleted == ["PT-AB123"]
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        service.close()
+
+
+def test_queued_caller_gets_504_within_rpc_timeout():
+    service = MikroTikService()
+    service.RPC_TIMEOUT = 0.1
+    release = threading.Event()
+
+    def hung_rpc(host, port):
+        release.wait(5)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        # Ocupar todos los huecos del router con llamadas colgadas
+        for _ in range(service.MAX_CONCURRENT_PER_ROUTER):
+            with pytest.raises(HTTPException):
+                await service._run_sync(hung_rpc, "10.0.0.1", 8728)
+
+        started = loop.time()
+        with pytest.raises(HTTPException) as exc:
+            await service._run_sync(hung_rpc, "10.0.0.1", 8728)
+        assert exc.value.status_code == 504
+        assert loop.time() - started < service.RPC_TIMEOUT * 2
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        service.close()